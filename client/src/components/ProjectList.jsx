@@ -71,6 +71,15 @@ export function ProjectList({ onSelectProject }) {
                             {new Date(project.updated_at).toLocaleDateString()}
                         </div>
 
+                        {project.thumbnail_url && (
+                            <img
+                                src={`http://localhost:8000${project.thumbnail_url}`}
+                                alt=""
+                                loading="lazy"
+                                className="w-full aspect-video object-cover rounded-lg mb-4 border border-white/5"
+                            />
+                        )}
+
                         <h3 className="text-xl font-bold text-white mb-2 line-clamp-2">
                             {project.topic}
                         </h3>
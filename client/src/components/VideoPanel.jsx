@@ -1,6 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import { api } from '../services/api';
 
+// Safari and most mobile browsers play HLS natively; elsewhere we keep the MP4
+const supportsNativeHls = () =>
+    typeof document !== 'undefined' &&
+    document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+
 export function VideoPanel({ project, onRefresh }) {
     const [generating, setGenerating] = useState(false);
     const [status, setStatus] = useState(project.status || 'idle');
@@ -8,14 +13,15 @@ export function VideoPanel({ project, onRefresh }) {
 
     // Poll status while running
     useEffect(() => {
-        if (project.status === 'running' || project.status === 'scripting' || project.status === 'generating_assets' || project.status === 'rendering') {
+        if (project.status === 'queued' || project.status === 'running' || project.status === 'scripting' || project.status === 'generating_assets' || project.status === 'rendering') {
             const interval = setInterval(async () => {
-                const p = await api.getProject(project.id);
-                setStatus(p.status);
-                if (p.status === 'completed' || p.status === 'failed') {
+                const s = await api.getProjectStatus(project.id);
+                setStatus(s.status);
+                if (s.status === 'completed' || s.status === 'failed') {
+                    clearInterval(interval);
+                    const p = await api.getProject(project.id);
                     setVideoUrl(p.video_url);
                     onRefresh(p); // Update parent state
-                    clearInterval(interval);
                 }
             }, 2000);
             return () => clearInterval(interval);
@@ -25,6 +31,8 @@ export function VideoPanel({ project, onRefresh }) {
         }
     }, [project]);
 
+    const playbackUrl = project.hls_url && supportsNativeHls() ? project.hls_url : videoUrl;
+
     const handleGenerate = async () => {
         try {
             setGenerating(true);
@@ -39,6 +47,7 @@ export function VideoPanel({ project, onRefresh }) {
 
     const getStatusLabel = () => {
         switch (status) {
+            case 'queued': return 'Queued...';
             case 'scripting': return 'Writing Script...';
             case 'generating_assets': return 'Creating Visuals (Veo)...';
             case 'rendering': return 'Rendering Audio & Video...';
@@ -54,7 +63,9 @@ export function VideoPanel({ project, onRefresh }) {
             <div className="w-full aspect-video bg-black rounded-2xl border border-white/5 shadow-2xl overflow-hidden relative group max-h-[60vh]">
                 {videoUrl ? (
                     <video
-                        src={`http://localhost:8000${videoUrl}`}
+                        src={`http://localhost:8000${playbackUrl}`}
+                        poster={project.poster_url ? `http://localhost:8000${project.poster_url}` : undefined}
+                        preload="metadata"
                         controls
                         className="w-full h-full object-contain"
                         autoPlay={status === 'completed'} // Autoplay if just finished
@@ -82,7 +93,7 @@ export function VideoPanel({ project, onRefresh }) {
             <div className="mt-8 flex gap-4 w-full max-w-lg justify-center">
                 <button
                     onClick={handleGenerate}
-                    disabled={status === 'running' || status === 'scripting' || status === 'generating_assets' || status === 'rendering'}
+                    disabled={status === 'queued' || status === 'running' || status === 'scripting' || status === 'generating_assets' || status === 'rendering'}
                     className="bg-white text-black px-8 py-3 rounded-full font-bold hover:bg-zinc-200 disabled:opacity-50 transition-all flex items-center gap-2"
                 >
                     {status === 'completed' ? 'Regenerate Video' : 'Generate Video'}
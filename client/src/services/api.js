@@ -16,11 +16,23 @@ export const api = {
         return res.json();
     },
 
+    searchProjects: async (query, field = null) => {
+        const params = new URLSearchParams({ q: query });
+        if (field) params.set('field', field);
+        const res = await fetch(`${BASE_URL}/projects/search?${params}`);
+        return res.json();
+    },
+
     getProject: async (projectId) => {
         const res = await fetch(`${BASE_URL}/projects/${projectId}`);
         return res.json();
     },
 
+    getProjectStatus: async (projectId) => {
+        const res = await fetch(`${BASE_URL}/projects/${projectId}/status`);
+        return res.json();
+    },
+
     // Updates
     updateScript: async (projectId, script) => {
         const res = await fetch(`${BASE_URL}/projects/${projectId}/script`, {
@@ -0,0 +1,191 @@
+import os
+import shutil
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app.engine import media
+
+class AssetStore:
+    """
+    Where project media lives. Generation always works on a local directory
+    (moviepy/ffmpeg need real files); a store decides whether rendered media is
+    served from that directory or published elsewhere.
+    """
+
+    # True when /media should stream files from local disk rather than redirect
+    serves_locally = True
+
+    def __init__(self, base_dir: str = "storage"):
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def local_dir(self, project_id: str, create: bool = True) -> str:
+        path = os.path.join(self.base_dir, project_id)
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    def publish(self, project_id: str, relpaths: List[str]) -> bool:
+        """Makes rendered media available to clients. Nothing to do locally."""
+        return True
+
+    def url_for(self, project_id: str, version: str, relpath: str) -> Optional[str]:
+        """Where clients should fetch a published file from, if not from /media directly."""
+        return None
+
+    def discard_local(self, project_id: str, relpaths: List[str]):
+        """Drops local copies of published files. Local media is the published copy, so it stays."""
+
+    def fetch(self, project_id: str, version: str, relpath: str, dest_path: str) -> bool:
+        """Copies a published file back to local disk. Nothing is ever published elsewhere locally."""
+        return False
+
+    def read_bytes(self, project_id: str, version: str, relpath: str) -> Optional[bytes]:
+        path = os.path.join(self.local_dir(project_id, create=False), relpath)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+class LocalAssetStore(AssetStore):
+    """Media stays in `storage/<project_id>` and is served by the API itself."""
+
+class S3AssetStore(AssetStore):
+    """
+    Publishes rendered media to an S3-compatible bucket (AWS S3, MinIO, R2...)
+    under content-addressed keys `<prefix><project_id>/<version>/<relpath>`,
+    and hands clients presigned (or public/CDN) URLs. The local directory is
+    only scratch space for generation.
+    """
+
+    serves_locally = False
+
+    def __init__(
+        self,
+        bucket: str,
+        base_dir: str = "storage",
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+        presign_expiry: int = 3600,
+        upload_workers: int = 8,
+        multipart_chunk_mb: int = 8,
+    ):
+        super().__init__(base_dir)
+        # Optional dependency: only needed when the S3 backend is selected
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.presign_expiry = presign_expiry
+        self.upload_workers = upload_workers
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        chunk_size = multipart_chunk_mb * 1024 * 1024
+        # Large files are split into parts that upload concurrently
+        self.transfer_config = TransferConfig(
+            multipart_threshold=chunk_size,
+            multipart_chunksize=chunk_size,
+            max_concurrency=upload_workers,
+            use_threads=True,
+        )
+
+    def _key(self, project_id: str, version: str, relpath: str) -> str:
+        return f"{self.prefix}{project_id}/{version}/{relpath}"
+
+    def _upload(self, project_id: str, project_dir: str, relpath: str):
+        path = os.path.join(project_dir, relpath)
+        version = media.file_digest(os.path.join(project_dir, media.versioned_by(relpath)))
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if relpath.endswith(".m3u8"):
+            content_type = "application/vnd.apple.mpegurl"
+        self.client.upload_file(
+            path, self.bucket, self._key(project_id, version, relpath),
+            ExtraArgs={"ContentType": content_type, "CacheControl": media.MEDIA_CACHE_CONTROL},
+            Config=self.transfer_config,
+        )
+
+    def publish(self, project_id: str, relpaths: List[str]) -> bool:
+        project_dir = self.local_dir(project_id, create=False)
+        relpaths = [r for r in relpaths if os.path.isfile(os.path.join(project_dir, r))]
+        print(f"☁️ Publishing {len(relpaths)} files for {project_id} to s3://{self.bucket}/{self.prefix}")
+        try:
+            # Files upload in parallel (many small HLS segments); big files are
+            # additionally split into parallel multipart uploads by boto3.
+            with ThreadPoolExecutor(max_workers=self.upload_workers) as pool:
+                for future in [pool.submit(self._upload, project_id, project_dir, r) for r in relpaths]:
+                    future.result()
+            return True
+        except Exception as e:
+            print(f"❌ Publishing to object store failed: {e}")
+            return False
+
+    def url_for(self, project_id: str, version: str, relpath: str) -> Optional[str]:
+        key = self._key(project_id, version, relpath)
+        if self.public_base_url:
+            return f"{self.public_base_url}/{key}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=self.presign_expiry,
+        )
+
+    def discard_local(self, project_id: str, relpaths: List[str]):
+        # Published media is served from the bucket; keeping it on disk would
+        # make API nodes stateful again
+        project_dir = self.local_dir(project_id, create=False)
+        for relpath in relpaths:
+            try:
+                os.remove(os.path.join(project_dir, relpath))
+            except FileNotFoundError:
+                continue
+        if any(r.startswith("hls/") for r in relpaths):
+            shutil.rmtree(os.path.join(project_dir, "hls"), ignore_errors=True)
+
+    def fetch(self, project_id: str, version: str, relpath: str, dest_path: str) -> bool:
+        tmp_path = dest_path + ".part"
+        try:
+            self.client.download_file(
+                self.bucket, self._key(project_id, version, relpath), tmp_path, Config=self.transfer_config
+            )
+            os.replace(tmp_path, dest_path)
+            return True
+        except Exception as e:
+            print(f"❌ Fetching {relpath} for {project_id} from object store failed: {e}")
+            return False
+
+    @property
+    def redirect_max_age(self) -> int:
+        # A cached redirect must not outlive the presigned URL it points to
+        if self.public_base_url:
+            return 24 * 3600
+        return self.presign_expiry // 2
+
+    def read_bytes(self, project_id: str, version: str, relpath: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(project_id, version, relpath))
+            return response["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+def from_env(base_dir: str = "storage") -> AssetStore:
+    """
+    Builds the asset store selected by ASSET_STORE ("local" or "s3").
+    """
+    backend = os.getenv("ASSET_STORE", "local").lower()
+    if backend == "s3":
+        bucket = os.getenv("S3_BUCKET")
+        if not bucket:
+            raise Exception("ASSET_STORE=s3 requires S3_BUCKET")
+        return S3AssetStore(
+            bucket=bucket,
+            base_dir=base_dir,
+            prefix=os.getenv("S3_PREFIX", ""),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            public_base_url=os.getenv("S3_PUBLIC_BASE_URL") or None,
+            presign_expiry=int(os.getenv("S3_PRESIGN_EXPIRY_SECONDS", "3600")),
+            upload_workers=int(os.getenv("S3_UPLOAD_WORKERS", "8")),
+        )
+    return LocalAssetStore(base_dir)
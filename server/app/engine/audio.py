@@ -1,14 +1,193 @@
-from gtts import gTTS
 import os
+import json
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Extensions a scene's narration may have, preferred first. WAV (local engines)
+# is plain PCM, so the director does not need to decode it.
+AUDIO_EXTENSIONS = (".wav", ".mp3")
+
+def _write_atomic(produce, output_path: str) -> bool:
+    # Write then rename so an interrupted run never leaves a partial file
+    tmp_path = output_path + ".part"
+    produce(tmp_path)
+    os.replace(tmp_path, output_path)
+    return True
+
+class TTSEngine(ABC):
+    """
+    Text-to-speech backend. Engines that can synthesize many texts in one call
+    override synthesize_batch; the default falls back to one call per text.
+    """
+
+    name = "base"
+    extension = ".mp3"
+
+    @abstractmethod
+    def synthesize(self, text: str, output_path: str) -> bool:
+        ...
+
+    def synthesize_batch(self, items: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """Synthesizes (text, output_path) pairs; returns success per output path."""
+        results = {}
+        for text, path in items:
+            # One failing scene must not cost the rest their narration
+            try:
+                results[path] = self.synthesize(text, path)
+            except Exception as e:
+                print(f"Error generating audio {path}: {e}")
+                results[path] = False
+        return results
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech over the network; one request per sentence chunk."""
+
+    name = "gtts"
+    extension = ".mp3"
+
+    def synthesize(self, text: str, output_path: str) -> bool:
+        from gtts import gTTS
+
+        tts = gTTS(text, lang='en')
+        return _write_atomic(tts.save, output_path)
+
+class PiperEngine(TTSEngine):
+    """
+    Offline neural TTS with piper (https://github.com/rhasspy/piper). The voice
+    model is loaded once per batch and every text is synthesized by the same
+    process via --json-input.
+    """
+
+    name = "piper"
+    extension = ".wav"
+
+    def __init__(self, model_path: str, binary: str = "piper"):
+        self.model_path = model_path
+        self.binary = binary
+
+    def synthesize(self, text: str, output_path: str) -> bool:
+        return self.synthesize_batch([(text, output_path)]).get(output_path, False)
+
+    def synthesize_batch(self, items: List[Tuple[str, str]]) -> Dict[str, bool]:
+        if not items:
+            return {}
+        lines = "\n".join(
+            json.dumps({"text": text, "output_file": path + ".part"}) for text, path in items
+        )
+        subprocess.run(
+            [self.binary, "--model", self.model_path, "--json-input"],
+            input=lines.encode("utf-8"),
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        results = {}
+        for _, path in items:
+            if os.path.exists(path + ".part"):
+                os.replace(path + ".part", path)
+                results[path] = True
+            else:
+                results[path] = False
+        return results
+
+class EspeakEngine(TTSEngine):
+    """
+    Offline formant TTS with espeak-ng. It writes one file per invocation, so a
+    batch runs the (millisecond-scale) processes concurrently.
+    """
+
+    name = "espeak"
+    extension = ".wav"
+
+    def __init__(self, binary: str = "espeak-ng", voice: str = "en", workers: int = 4):
+        self.binary = binary
+        self.voice = voice
+        self.workers = workers
+
+    def synthesize(self, text: str, output_path: str) -> bool:
+        return _write_atomic(
+            lambda tmp_path: subprocess.run(
+                # "--" so narration starting with "-" is not read as an option
+                [self.binary, "-v", self.voice, "-w", tmp_path, "--", text],
+                stdout=subprocess.DEVNULL,
+                check=True,
+            ),
+            output_path,
+        )
+
+    def synthesize_batch(self, items: List[Tuple[str, str]]) -> Dict[str, bool]:
+        def run(item):
+            text, path = item
+            try:
+                return path, self.synthesize(text, path)
+            except Exception as e:
+                print(f"Error generating audio {path}: {e}")
+                return path, False
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(pool.map(run, items))
+
+_engine: Optional[TTSEngine] = None
+
+def get_engine() -> TTSEngine:
+    """
+    The TTS engine selected by TTS_ENGINE ("gtts", "piper" or "espeak").
+    """
+    global _engine
+    if _engine is None:
+        choice = os.getenv("TTS_ENGINE", "gtts").lower()
+        if choice == "piper":
+            model_path = os.getenv("PIPER_MODEL")
+            if not model_path:
+                raise Exception("TTS_ENGINE=piper requires PIPER_MODEL")
+            _engine = PiperEngine(model_path, binary=os.getenv("PIPER_BINARY", "piper"))
+        elif choice == "espeak":
+            binary = os.getenv("ESPEAK_BINARY") or shutil.which("espeak-ng") or "espeak"
+            _engine = EspeakEngine(binary=binary, voice=os.getenv("ESPEAK_VOICE", "en"))
+        else:
+            _engine = GTTSEngine()
+    return _engine
+
+def find_scene_audio(assets_dir: str, scene_id) -> Optional[str]:
+    """Existing narration for a scene, whichever engine produced it."""
+    for extension in AUDIO_EXTENSIONS:
+        path = os.path.join(assets_dir, f"scene_{scene_id}{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def scene_audio_path(assets_dir: str, scene_id) -> str:
+    """Where the configured engine should write a scene's narration."""
+    return os.path.join(assets_dir, f"scene_{scene_id}{get_engine().extension}")
 
 def generate_audio(text: str, output_path: str):
     """
-    Generates MP3 audio from text using Google Text-to-Speech (gTTS).
+    Generates narration audio from text with the configured TTS engine.
     """
     try:
-        tts = gTTS(text, lang='en')
-        tts.save(output_path)
-        return True
+        return get_engine().synthesize(text, output_path)
     except Exception as e:
         print(f"Error generating audio: {e}")
         return False
+
+def generate_scene_audio(scenes: List[dict], assets_dir: str) -> Dict[str, bool]:
+    """
+    Synthesizes narration for every scene that has none yet, in one batched
+    engine call where the engine supports it.
+    """
+    items = [
+        (scene['voiceover'], scene_audio_path(assets_dir, scene['id']))
+        for scene in scenes
+        if not find_scene_audio(assets_dir, scene['id'])
+    ]
+    if not items:
+        return {}
+    engine = get_engine()
+    print(f"🔊 Synthesizing {len(items)} voiceovers with {engine.name}")
+    try:
+        return engine.synthesize_batch(items)
+    except Exception as e:
+        print(f"Error generating audio: {e}")
+        return {path: False for _, path in items}
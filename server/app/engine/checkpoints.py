@@ -0,0 +1,202 @@
+import os
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from typing import List, Optional
+from app.engine.lifecycle import ACTIVE_STATUSES
+
+# Identifies this process as a lease holder
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# A generation whose lease has not been renewed for this long is considered
+# abandoned (worker crashed or was redeployed) and may be taken over.
+LEASE_SECONDS = int(os.getenv("GENERATION_LEASE_SECONDS", "120"))
+
+# The scene text each kind of asset is generated from
+ASSET_SOURCES = {'video': 'visual_prompt', 'audio': 'voiceover'}
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256((text or '').encode("utf-8")).hexdigest()[:16]
+
+def _prompt_hash(scene: dict, kind: str = 'video') -> str:
+    return _text_hash(scene.get(ASSET_SOURCES[kind]))
+
+# --- Leases ---
+
+def acquire_lease(project_manager, project_id: str, owner: str = WORKER_ID, ttl: int = LEASE_SECONDS) -> bool:
+    """Claims the project's generation lease unless another live worker holds it."""
+    def claim(checkpoint: dict) -> bool:
+        lease = checkpoint.get('lease') or {}
+        now = time.time()
+        if lease.get('owner') not in (None, owner) and lease.get('expires_at', 0) > now:
+            return False
+        checkpoint['lease'] = {'owner': owner, 'expires_at': now + ttl, 'heartbeat_at': now}
+        return True
+    return bool(project_manager.update_checkpoint(project_id, claim))
+
+def renew_lease(project_manager, project_id: str, owner: str = WORKER_ID, ttl: int = LEASE_SECONDS) -> bool:
+    def renew(checkpoint: dict) -> bool:
+        lease = checkpoint.get('lease') or {}
+        if lease.get('owner') != owner:
+            return False
+        now = time.time()
+        lease.update({'expires_at': now + ttl, 'heartbeat_at': now})
+        checkpoint['lease'] = lease
+        return True
+    return bool(project_manager.update_checkpoint(project_id, renew))
+
+def release_lease(project_manager, project_id: str, owner: str = WORKER_ID):
+    def release(checkpoint: dict):
+        if (checkpoint.get('lease') or {}).get('owner') == owner:
+            checkpoint.pop('lease', None)
+    project_manager.update_checkpoint(project_id, release)
+
+def lease_is_live(checkpoint: dict) -> bool:
+    lease = checkpoint.get('lease') or {}
+    return bool(lease.get('owner')) and lease.get('expires_at', 0) > time.time()
+
+class LeaseLost(Exception):
+    """The run's generation lease expired or was taken over by another worker."""
+
+class GenerationLease:
+    """
+    Holds a project's generation lease for the duration of a run, renewing it
+    from a heartbeat thread so other workers can tell a live run from a dead one.
+    """
+
+    def __init__(self, project_manager, project_id: str, ttl: int = LEASE_SECONDS):
+        self.project_manager = project_manager
+        self.project_id = project_id
+        self.ttl = ttl
+        self.lost = False
+        self.expires_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self) -> bool:
+        # Measured before the write, so the local expiry is never later than the stored one
+        started = time.time()
+        if not acquire_lease(self.project_manager, self.project_id, ttl=self.ttl):
+            return False
+        self.expires_at = started + self.ttl
+        self._thread = threading.Thread(
+            target=self._heartbeat, name=f"lease-{self.project_id[:8]}", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.ttl / 3):
+            started = time.time()
+            try:
+                if not renew_lease(self.project_manager, self.project_id, ttl=self.ttl):
+                    print(f"⚠️ Lost generation lease for {self.project_id}")
+                    self.lost = True
+                    return
+                self.expires_at = started + self.ttl
+            except Exception as e:
+                # Keep trying; is_held() turns False once the last renewal expires
+                print(f"Lease heartbeat failed for {self.project_id}: {e}")
+
+    def is_held(self) -> bool:
+        return not self.lost and time.time() < self.expires_at
+
+    def check(self):
+        """Raises LeaseLost if another worker may now own this project."""
+        if not self.is_held():
+            raise LeaseLost(f"Generation lease for {self.project_id} was lost")
+
+    def release(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if not self.lost:
+            release_lease(self.project_manager, self.project_id)
+
+# --- Scene progress ---
+
+def scene_operation(project_manager, project_id: str, scene: dict) -> Optional[str]:
+    """
+    The Veo operation an earlier run submitted for this scene, if the scene's
+    prompt has not changed since.
+    """
+    entry = (project_manager.get_checkpoint(project_id).get('scenes') or {}).get(str(scene['id'])) or {}
+    if entry.get('operation') and entry.get('prompt_hash') == _prompt_hash(scene):
+        return entry['operation']
+    return None
+
+def record_scene_operation(project_manager, project_id: str, scene: dict, operation_name: str, model_name: str):
+    def record(checkpoint: dict):
+        entry = checkpoint.setdefault('scenes', {}).setdefault(str(scene['id']), {})
+        entry.update({
+            'operation': operation_name,
+            'model': model_name,
+            'prompt_hash': _prompt_hash(scene),
+            'submitted_at': time.time(),
+        })
+    project_manager.update_checkpoint(project_id, record)
+
+def record_scene_asset(project_manager, project_id: str, scene: dict, kind: str):
+    def record(checkpoint: dict):
+        entry = checkpoint.setdefault('scenes', {}).setdefault(str(scene['id']), {})
+        # Remember which text the file on disk was made from
+        entry.setdefault('assets', {})[kind] = _prompt_hash(scene, kind)
+        if kind == 'video':
+            # The operation's output is on disk; nothing left to re-attach to
+            entry.pop('operation', None)
+    project_manager.update_checkpoint(project_id, record)
+
+def scene_asset_is_stale(project_manager, project_id: str, scene: dict, kind: str) -> bool:
+    """
+    True when the checkpoint shows the scene's `kind` asset on disk was made
+    from different text, e.g. for a script that was discarded when a run
+    crashed mid-stream. Assets with no checkpoint record are trusted.
+    """
+    entry = (project_manager.get_checkpoint(project_id).get('scenes') or {}).get(str(scene['id'])) or {}
+    recorded = (entry.get('assets') or {}).get(kind)
+    if recorded is None and kind == 'video':
+        # Downloaded but not yet recorded when the run died
+        recorded = entry.get('prompt_hash')
+    return recorded is not None and recorded != _prompt_hash(scene, kind)
+
+# --- Single-operation modes (image_constrained, video_extension) ---
+
+def render_operation(project_manager, project_id: str, prompt: str) -> Optional[str]:
+    """The Veo operation an earlier run submitted for this project's prompt, if any."""
+    entry = project_manager.get_checkpoint(project_id).get('render') or {}
+    if entry.get('operation') and entry.get('prompt_hash') == _text_hash(prompt):
+        return entry['operation']
+    return None
+
+def record_render_operation(project_manager, project_id: str, prompt: str, operation_name: str, model_name: str):
+    def record(checkpoint: dict):
+        checkpoint['render'] = {
+            'operation': operation_name,
+            'model': model_name,
+            'prompt_hash': _text_hash(prompt),
+            'submitted_at': time.time(),
+        }
+    project_manager.update_checkpoint(project_id, record)
+
+def clear_progress(project_manager, project_id: str):
+    """Drops scene and render progress once a generation has completed."""
+    def clear(checkpoint: dict):
+        checkpoint.pop('scenes', None)
+        checkpoint.pop('render', None)
+    project_manager.update_checkpoint(project_id, clear)
+
+# --- Recovery ---
+
+# Queued projects (e.g. from a batch) are waiting in some worker's in-memory
+# queue, which does not survive a restart either
+RESUMABLE_STATUSES = ACTIVE_STATUSES | {"queued"}
+
+def find_stale_generations(project_manager) -> List[str]:
+    """Projects stuck in a resumable status whose lease has expired or was never taken."""
+    stale = []
+    for project_id, status in project_manager.list_project_statuses().items():
+        if status in RESUMABLE_STATUSES and not lease_is_live(project_manager.get_checkpoint(project_id)):
+            stale.append(project_id)
+    return stale
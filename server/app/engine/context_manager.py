@@ -1,37 +1,136 @@
-from typing import Dict, Optional
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+class CompiledMemory:
+    """
+    A Memory object prepared for repeated prompt injection. Character names and
+    aliases are compiled into a single word-boundary regex, so matching a prompt
+    is one pass regardless of how many characters the memory holds.
+
+    Characters may be stored as `{name: description}` or, to declare aliases,
+    `{name: {"description": ..., "aliases": [...]}}`.
+    """
+
+    def __init__(self, memory: Dict):
+        self.version = self.memory_version(memory)
+        self.visual_style = memory.get('visual_style')
+
+        # name -> description, kept in the memory's own order for stable output
+        self.descriptions: Dict[str, str] = {}
+        # casefolded name/alias -> (term, canonical character name)
+        self.lookup: Dict[str, tuple] = {}
+
+        for name, value in (memory.get('characters') or {}).items():
+            if isinstance(value, dict):
+                description = value.get('description', '')
+                aliases = value.get('aliases') or []
+            else:
+                description = value
+                aliases = []
+            self.descriptions[name] = description
+            for term in [name, *aliases]:
+                term = term.strip() if isinstance(term, str) else ''
+                if term:
+                    self.lookup.setdefault(term.casefold(), (term, name))
+
+        self.pattern = None
+        # regex group name -> canonical character name. Matches are mapped back
+        # through the group rather than the matched text, whose case folding
+        # under IGNORECASE need not equal the stored term's ("İvan", "ſam").
+        self.groups: Dict[str, str] = {}
+        if self.lookup:
+            # Longest first so "Dr Al Smith" wins over "Al" at the same position
+            entries = sorted(self.lookup.values(), key=lambda entry: len(entry[0]), reverse=True)
+            alternatives = []
+            for i, (term, name) in enumerate(entries):
+                self.groups[f"t{i}"] = name
+                alternatives.append(f"(?P<t{i}>{re.escape(term)})")
+            self.pattern = re.compile(rf"(?<!\w)(?:{'|'.join(alternatives)})(?!\w)", re.IGNORECASE)
+
+    @staticmethod
+    def memory_version(memory: Dict) -> str:
+        payload = json.dumps(memory, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def match_characters(self, prompt: str) -> List[str]:
+        """Canonical names of characters mentioned in the prompt, in memory order."""
+        if not self.pattern:
+            return []
+        found = {self.groups[m.lastgroup] for m in self.pattern.finditer(prompt)}
+        return [name for name in self.descriptions if name in found]
+
+    def apply(self, prompt: str) -> str:
+        enhanced_prompt = prompt
+
+        # 1. Inject Character Descriptions
+        for name in self.match_characters(prompt):
+            description = self.descriptions[name]
+            # Avoid double description if already present (naive check)
+            if description and description not in enhanced_prompt:
+                # Append description: "Professor (an elderly owl...)"
+                enhanced_prompt += f" -- Character Detail: {name} is {description}."
+
+        # 2. Inject Global Visual Style
+        if self.visual_style:
+            enhanced_prompt += f" -- Visual Style: {self.visual_style}."
+
+        return enhanced_prompt
 
 class ContextManager:
     """
     Handles certain logic to inject 'Memory' (styles, characters) into generation prompts.
     """
-    
-    @staticmethod
-    def apply_context(prompt: str, memory: Optional[Dict] = None) -> str:
+
+    MAX_COMPILED_MEMORIES = 64
+    MAX_CACHED_PROMPTS = 1024
+
+    _compiled: "OrderedDict[str, CompiledMemory]" = OrderedDict()
+    _prompts: "OrderedDict[tuple, str]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def compile(cls, memory: Dict) -> CompiledMemory:
+        """Returns the compiled form of a memory, reusing it while the memory is unchanged."""
+        version = CompiledMemory.memory_version(memory)
+        with cls._lock:
+            compiled = cls._compiled.get(version)
+            if compiled:
+                cls._compiled.move_to_end(version)
+                return compiled
+
+        compiled = CompiledMemory(memory)
+        with cls._lock:
+            cls._compiled[version] = compiled
+            while len(cls._compiled) > cls.MAX_COMPILED_MEMORIES:
+                cls._compiled.popitem(last=False)
+        return compiled
+
+    @classmethod
+    def apply_context(cls, prompt: str, memory: Optional[Dict] = None) -> str:
         """
         Rewrites a scene prompt to include visual styles and character descriptions
-        defined in the Memory object.
+        defined in the Memory object. Results are memoized per (memory version, prompt).
         """
         if not memory:
             return prompt
-            
-        enhanced_prompt = prompt
-        
-        # 1. Inject Character Descriptions
-        characters = memory.get('characters', {})
-        for name, description in characters.items():
-            # Simple check if character name is in prompt (case-insensitiveish)
-            if name.lower() in prompt.lower():
-                # Avoid double description if already present (naive check)
-                if description not in enhanced_prompt:
-                    # Append description: "Professor (an elderly owl...)"
-                    # Using a simple append for now to be robust
-                    enhanced_prompt += f" -- Character Detail: {name} is {description}."
 
-        # 2. Inject Global Visual Style
-        visual_style = memory.get('visual_style')
-        if visual_style:
-            enhanced_prompt += f" -- Visual Style: {visual_style}."
-            
+        compiled = cls.compile(memory)
+        key = (compiled.version, prompt)
+        with cls._lock:
+            cached = cls._prompts.get(key)
+            if cached is not None:
+                cls._prompts.move_to_end(key)
+                return cached
+
+        enhanced_prompt = compiled.apply(prompt)
+        with cls._lock:
+            cls._prompts[key] = enhanced_prompt
+            while len(cls._prompts) > cls.MAX_CACHED_PROMPTS:
+                cls._prompts.popitem(last=False)
         return enhanced_prompt
 
     @staticmethod
@@ -1,30 +1,176 @@
 import os
-from typing import Optional, List, Dict, Any
+import copy
+import hashlib
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
+from sqlalchemy import text, inspect, or_, select as sa_select
+from sqlalchemy.engine import make_url
 from sqlmodel import Session, create_engine, select, SQLModel
 from app.engine.models import Project
+from app.engine.asset_store import AssetStore, LocalAssetStore
+from app.engine.storage import SEARCH_FIELDS, STATUS_COLUMNS, project_search_fields, search_tokens
+
+# Per-field full-text expressions over the JSONB columns. Each one is backed by
+# a GIN expression index, and queries must use the identical expression to hit it.
+# The 'simple' config (no stemming) matches the file backend's tokenizer.
+SEARCH_EXPRESSIONS = {
+    "topic": "to_tsvector('simple', coalesce(topic, ''))",
+    "style": "to_tsvector('simple', coalesce(memory ->> 'visual_style', ''))",
+    # Names plus aliases; lax mode skips characters stored as plain descriptions
+    "character": "to_tsvector('simple', coalesce((jsonb_path_query_array(memory, '$.characters.keyvalue().key') || jsonb_path_query_array(memory, '$.characters.*.aliases[*]'))::text, ''))",
+    "voiceover": "to_tsvector('simple', coalesce(jsonb_path_query_array(script, '$.scenes[*].voiceover')::text, ''))",
+}
+
+# Internal bookkeeping (generation lease, Veo operation names); read only via
+# get_checkpoint and never returned by the API
+PRIVATE_COLUMNS = {"checkpoint"}
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Connection pool settings from the environment. SQLite (development) keeps
+    SQLAlchemy's defaults since its pools do not take sizing arguments.
+    """
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # Drop connections the server or a proxy closed while they sat idle
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+
+class ReadCache:
+    """
+    Tiny in-process TTL cache for hot project reads (status polling). Entries
+    are dropped on every write through this manager; other processes' writes
+    become visible after at most `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, key: tuple):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+        # Callers mutate project dicts before saving them back
+        return copy.deepcopy(value)
+
+    def put(self, key: tuple, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+
+    def invalidate(self, project_id: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == project_id]:
+                del self._entries[key]
 
 class DBProjectManager:
-    def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
+    def __init__(self, database_url: str, asset_store: Optional[AssetStore] = None):
+        self.engine = create_engine(database_url, **engine_options(database_url))
+        self.table = Project.__table__
+        self.project_columns = [column for column in self.table.c if column.name not in PRIVATE_COLUMNS]
+        # Off by default; e.g. DB_READ_CACHE_TTL_MS=500 absorbs polling bursts
+        self.read_cache = ReadCache(int(os.getenv("DB_READ_CACHE_TTL_MS", "0")) / 1000)
         # Create tables if they don't exist
         SQLModel.metadata.create_all(self.engine)
+        self._upgrade_schema()
         
-        # Ensure storage dir exists for assets even if using DB for metadata
-        os.makedirs("storage", exist_ok=True)
+        # Assets live in the asset store even when metadata is in the DB
+        self.asset_store = asset_store or LocalAssetStore("storage")
+
+    def _upgrade_schema(self):
+        """
+        Brings tables created by older versions up to date: create_all() only
+        creates missing tables, never missing columns or indexes.
+        """
+        table = Project.__table__
+        existing = {c['name']: c['type'] for c in inspect(self.engine).get_columns(table.name)}
+        is_postgres = self.engine.dialect.name == "postgresql"
+
+        with self.engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
 
-    def _get_project_path(self, project_id: str) -> str:
-        # We still keep local file storage for assets/videos for now
-        # In a real cloud setup, this might point to S3
-        path = os.path.join("storage", project_id)
-        os.makedirs(path, exist_ok=True)
-        return path
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
-    def create_project(self, name: str, topic: str = "", mode: str = "text_to_video") -> dict:
+            if not is_postgres:
+                return
+
+            # Tables created before the JSONB switch still have plain JSON columns
+            for column in ("script", "memory", "assets"):
+                if existing.get(column).__class__.__name__ == "JSON":
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+                    ))
+            # Index names carry a hash of their expression, so changing an
+            # expression builds a new index and drops the outdated one
+            existing_indexes = set(conn.execute(
+                text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": table.name}
+            ).scalars())
+            for field, expression in SEARCH_EXPRESSIONS.items():
+                prefix = f"ix_{table.name}_search_{field}"
+                name = f"{prefix}_{hashlib.sha256(expression.encode('utf-8')).hexdigest()[:8]}"
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {table.name} USING GIN (({expression}))"
+                ))
+                for stale in existing_indexes:
+                    if stale != name and (stale == prefix or stale.startswith(prefix + "_")):
+                        conn.execute(text(f"DROP INDEX IF EXISTS {stale}"))
+
+    @contextmanager
+    def _writing(self, project_id: str):
+        # Invalidate after the commit too, so a read racing the write cannot
+        # re-cache the old row
+        self.read_cache.invalidate(project_id)
+        try:
+            yield
+        finally:
+            self.read_cache.invalidate(project_id)
+
+    @staticmethod
+    def _dump(project: Project) -> dict:
+        return project.model_dump(exclude=PRIVATE_COLUMNS)
+
+    def _get_project_path(self, project_id: str, create: bool = True) -> str:
+        # Local working directory for generation; rendered media may be
+        # published elsewhere by the asset store
+        return self.asset_store.local_dir(project_id, create=create)
+
+    def create_project(self, name: str, topic: str = "", mode: str = "text_to_video", parent_project_id: Optional[str] = None) -> dict:
         project = Project(
             name=name, 
             topic=topic, 
             mode=mode,
+            parent_project_id=parent_project_id,
             memory={
                 "visual_style": "",
                 "characters": {},
@@ -40,19 +186,88 @@ class DBProjectManager:
             # Ensure local asset folder exists
             self._get_project_path(project.id)
             
-            return project.model_dump()
+            return self._dump(project)
 
-    def get_project(self, project_id: str) -> Optional[dict]:
+    def create_projects(self, items: List[dict], mode: str = "text_to_video", memory: Optional[dict] = None,
+                        batch_id: Optional[str] = None, status: str = "created") -> List[dict]:
+        """
+        Creates one project per item ({"topic", "name"}) sharing a mode, a memory
+        template and a batch id, in a single transaction.
+        """
+        memory = memory if memory is not None else {
+            "visual_style": "",
+            "characters": {},
+            "narrative_tone": ""
+        }
+        projects = [
+            Project(
+                name=item.get('name') or item['topic'],
+                topic=item['topic'],
+                mode=mode,
+                status=status,
+                batch_id=batch_id,
+                memory=copy.deepcopy(memory),
+            )
+            for item in items
+        ]
+
+        # expire_on_commit=False so dumping the new rows does not re-select each one
+        with Session(self.engine, expire_on_commit=False) as session:
+            session.add_all(projects)
+            session.commit()
+
+        for project in projects:
+            self._get_project_path(project.id)
+        return [self._dump(p) for p in projects]
+
+    def list_batch_statuses(self, batch_id: str) -> Dict[str, str]:
+        """Project id -> status for every project in a batch."""
         with Session(self.engine) as session:
-            project = session.get(Project, project_id)
-            if not project:
-                return None
-            return project.model_dump()
+            rows = session.exec(select(Project.id, Project.status).where(Project.batch_id == batch_id)).all()
+            return {project_id: status for project_id, status in rows}
+
+    def get_project(self, project_id: str, fresh: bool = False) -> Optional[dict]:
+        """
+        Read-only path: a Core select straight into a dict, skipping ORM
+        object construction, the identity map and model_dump(). Pass
+        fresh=True to bypass the read cache, which does not see other
+        workers' writes until it expires (pipeline and lease decisions).
+        """
+        cached = None if fresh else self.read_cache.get(("project", project_id))
+        if cached is not None:
+            return cached
+
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                sa_select(*self.project_columns).where(self.table.c.id == project_id)
+            ).mappings().first()
+        if not row:
+            return None
+        project = dict(row)
+        self.read_cache.put(("project", project_id), project)
+        return project
+
+    def get_project_status(self, project_id: str, fresh: bool = False) -> Optional[dict]:
+        """Status fields only, for polling; never loads the JSON columns."""
+        cached = None if fresh else self.read_cache.get(("status", project_id))
+        if cached is not None:
+            return cached
+
+        columns = [self.table.c[name] for name in STATUS_COLUMNS]
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                sa_select(*columns).where(self.table.c.id == project_id)
+            ).mappings().first()
+        if not row:
+            return None
+        status = dict(row)
+        self.read_cache.put(("status", project_id), status)
+        return status
 
     def save_project(self, project_id: str, data: dict):
         # In SQLModel, we update the object.
         # This method signature mimics the file-based save_project which took a dict.
-        with Session(self.engine) as session:
+        with self._writing(project_id), Session(self.engine) as session:
             project = session.get(Project, project_id)
             if not project:
                 return
@@ -70,6 +285,12 @@ class DBProjectManager:
                 project.assets = data['assets']
             if 'video_url' in data:
                 project.video_url = data['video_url']
+            if 'poster_url' in data:
+                project.poster_url = data['poster_url']
+            if 'thumbnail_url' in data:
+                project.thumbnail_url = data['thumbnail_url']
+            if 'hls_url' in data:
+                project.hls_url = data['hls_url']
             if 'error' in data:
                 project.error = data['error']
                 
@@ -77,7 +298,7 @@ class DBProjectManager:
             session.commit()
 
     def update_script(self, project_id: str, script: dict) -> Optional[dict]:
-        with Session(self.engine) as session:
+        with self._writing(project_id), Session(self.engine) as session:
             project = session.get(Project, project_id)
             if not project:
                 return None
@@ -89,10 +310,10 @@ class DBProjectManager:
             session.add(project)
             session.commit()
             session.refresh(project)
-            return project.model_dump()
+            return self._dump(project)
 
     def update_memory(self, project_id: str, memory: dict) -> Optional[dict]:
-        with Session(self.engine) as session:
+        with self._writing(project_id), Session(self.engine) as session:
             project = session.get(Project, project_id)
             if not project:
                 return None
@@ -103,10 +324,80 @@ class DBProjectManager:
             session.add(project)
             session.commit()
             session.refresh(project)
-            return project.model_dump()
+            return self._dump(project)
 
     def list_projects(self) -> list:
         with Session(self.engine) as session:
             statement = select(Project).order_by(Project.updated_at.desc())
             results = session.exec(statement).all()
-            return [p.model_dump() for p in results]
+            return [self._dump(p) for p in results]
+
+    def get_checkpoint(self, project_id: str) -> dict:
+        with Session(self.engine) as session:
+            checkpoint = session.exec(select(Project.checkpoint).where(Project.id == project_id)).first()
+            return dict(checkpoint or {})
+
+    def update_checkpoint(self, project_id: str, update: Callable[[dict], Any]) -> Any:
+        """
+        Atomically applies `update` to the project's generation checkpoint
+        (mutating it in place) and returns whatever `update` returns. The row
+        is locked for the read-modify-write so concurrent workers serialize.
+        """
+        with self._writing(project_id), Session(self.engine) as session:
+            project = session.exec(
+                select(Project).where(Project.id == project_id).with_for_update()
+            ).first()
+            if not project:
+                return None
+            # Copy so SQLAlchemy sees a new value for the JSON column
+            checkpoint = copy.deepcopy(project.checkpoint or {})
+            result = update(checkpoint)
+            project.checkpoint = checkpoint
+            session.add(project)
+            session.commit()
+            return result
+
+    def list_project_statuses(self) -> Dict[str, str]:
+        """Project id -> status for every project, without loading JSON columns."""
+        with Session(self.engine) as session:
+            rows = session.exec(select(Project.id, Project.status)).all()
+            return {project_id: status for project_id, status in rows}
+
+    def search_projects(self, query: str, field: Optional[str] = None, limit: int = 50) -> list:
+        """
+        Finds projects whose topic, visual style, character names/aliases or
+        voiceover text contain every word of the query. Restrict to one of SEARCH_FIELDS
+        with `field`.
+        """
+        fields = [field] if field else list(SEARCH_FIELDS)
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+
+        if self.engine.dialect.name != "postgresql":
+            # No full-text indexes outside Postgres (e.g. SQLite in development)
+            return self._scan_projects(tokens, fields, limit)
+
+        condition = or_(*[
+            text(f"{SEARCH_EXPRESSIONS[f]} @@ plainto_tsquery('simple', :q)").bindparams(q=" ".join(tokens))
+            for f in fields
+        ])
+        with Session(self.engine) as session:
+            statement = (
+                select(Project)
+                .where(condition)
+                .order_by(Project.updated_at.desc())
+                .limit(limit)
+            )
+            results = session.exec(statement).all()
+            return [self._dump(p) for p in results]
+
+    def _scan_projects(self, tokens: List[str], fields: List[str], limit: int) -> list:
+        matches = []
+        for project in self.list_projects():
+            documents = project_search_fields(project)
+            if any(set(tokens) <= set(search_tokens(documents[f])) for f in fields):
+                matches.append(project)
+                if len(matches) >= limit:
+                    break
+        return matches
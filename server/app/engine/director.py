@@ -1,9 +1,77 @@
 from moviepy import *
+from moviepy.config import FFMPEG_BINARY
+from PIL import Image
+from app.engine.audio import find_scene_audio
 import os
+import subprocess
+from typing import Optional
 
-def render_video(script_data: dict, assets_dir: str, output_path: str):
+RENDER_FPS = 24
+POSTER_FILENAME = "poster.jpg"
+THUMBNAIL_FILENAME = "thumbnail.jpg"
+THUMBNAIL_SIZE = (480, 270)
+
+# Move the moov atom to the front so playback can start before the whole file
+# has downloaded.
+FASTSTART_PARAMS = ["-movflags", "+faststart"]
+
+def remux_faststart(video_path: str) -> bool:
+    """
+    Rewrites an MP4 we did not encode ourselves (e.g. downloaded from Veo) with
+    the moov atom up front. Streams are copied, not re-encoded.
+    """
+    tmp_path = video_path + ".faststart.mp4"
+    try:
+        subprocess.run(
+            [FFMPEG_BINARY, "-y", "-loglevel", "error", "-i", video_path,
+             "-c", "copy", *FASTSTART_PARAMS, tmp_path],
+            check=True,
+        )
+        os.replace(tmp_path, video_path)
+        return True
+    except Exception as e:
+        print(f"Error remuxing {video_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+def write_previews(clip, assets_dir: str) -> bool:
+    """
+    Saves a poster frame and a small thumbnail so lists can show a preview
+    without loading the video.
+    """
+    poster_path = os.path.join(assets_dir, POSTER_FILENAME)
+    thumbnail_path = os.path.join(assets_dir, THUMBNAIL_FILENAME)
+    try:
+        # A frame a little way in is more representative than the first one
+        t = min(1.0, (clip.duration or 0) / 2)
+        frame = clip.get_frame(t)
+        poster = Image.fromarray(frame).convert("RGB")
+        poster.save(poster_path, quality=85)
+        poster.thumbnail(THUMBNAIL_SIZE)
+        poster.save(thumbnail_path, quality=80)
+        return True
+    except Exception as e:
+        print(f"Error writing previews: {e}")
+        return False
+
+def extract_previews(video_path: str, assets_dir: str) -> bool:
+    """Poster/thumbnail for videos that were not assembled by render_video."""
+    try:
+        clip = VideoFileClip(video_path)
+    except Exception as e:
+        print(f"Error loading video {video_path}: {e}")
+        return False
+    try:
+        return write_previews(clip, assets_dir)
+    finally:
+        clip.close()
+
+def render_video(script_data: dict, assets_dir: str, output_path: str, keyframe_interval: Optional[int] = None):
     """
     Assembles video from generated assets (mix of .mp4 clips and .png images).
+    A fixed keyframe_interval (in frames) lets the output be segmented for HLS
+    with stream copy instead of being re-encoded.
     """
     clips = []
     
@@ -13,7 +81,8 @@ def render_video(script_data: dict, assets_dir: str, output_path: str):
         # Asset Paths
         image_path = os.path.join(assets_dir, f"scene_{scene_id}.png")
         video_path = os.path.join(assets_dir, f"scene_{scene_id}.mp4")
-        audio_path = os.path.join(assets_dir, f"scene_{scene_id}.mp3")
+        # WAV from a local TTS engine, or MP3 from gTTS
+        audio_path = find_scene_audio(assets_dir, scene_id)
         
         # Determine Visual Clip
         visual_clip = None
@@ -42,7 +111,7 @@ def render_video(script_data: dict, assets_dir: str, output_path: str):
              except:
                  pass # Fonts can be tricky in docker/headless
 
-        if visual_clip and os.path.exists(audio_path):
+        if visual_clip and audio_path:
             # Load Audio
             audio_clip = AudioFileClip(audio_path)
             audio_duration = audio_clip.duration
@@ -64,7 +133,21 @@ def render_video(script_data: dict, assets_dir: str, output_path: str):
     if clips:
         # Concatenate
         final_video = concatenate_videoclips(clips)
-        final_video.write_videofile(output_path, fps=24, codec='libx264', audio_codec='aac')
+        ffmpeg_params = list(FASTSTART_PARAMS)
+        if keyframe_interval:
+            ffmpeg_params += [
+                "-g", str(keyframe_interval),
+                "-keyint_min", str(keyframe_interval),
+                "-sc_threshold", "0",
+            ]
+        final_video.write_videofile(
+            output_path, fps=RENDER_FPS, codec='libx264', audio_codec='aac',
+            ffmpeg_params=ffmpeg_params,
+            # moviepy's default temp audio path is shared by every render in
+            # the process's CWD; concurrent renders would clobber each other
+            temp_audiofile=os.path.join(assets_dir, "final_audio_tmp.m4a")
+        )
+        write_previews(final_video, assets_dir)
         return True
     else:
         print("No clips to render")
@@ -0,0 +1,273 @@
+import os
+import re
+import time
+import shutil
+import threading
+from typing import Dict, List, Optional
+
+# Projects in these states are being written to and are never touched
+ACTIVE_STATUSES = {"running", "scripting", "generating_assets", "rendering"}
+
+SCENE_FILE_PATTERN = re.compile(r"^scene_[\w-]+\.(mp4|png|mp3|wav)$")
+
+# Eviction order within the intermediates, cheapest to regenerate first.
+# Scene images are only an Imagen fallback and are not used by the renderer;
+# narration is a free gTTS call or a local TTS run; Veo clips are slow and paid, and are what an
+# incremental re-render after a script edit actually reuses, so they go last.
+EVICTION_TIERS = {".png": 0, ".mp3": 1, ".wav": 1, ".mp4": 2}
+
+# Leftovers from interrupted remuxes and downloads are safe to drop once
+# nothing has written to them for a while
+TEMP_SUFFIXES = (".faststart.mp4", ".part")
+TEMP_FILE_MIN_AGE_SECONDS = 15 * 60
+
+# Written by the file backend; its presence marks a directory as a project
+PROJECT_FILENAME = "project.json"
+
+class StorageLifecycleManager:
+    """
+    Keeps `storage/` bounded. Final renders, previews and HLS output are never
+    evicted; scene intermediates are evicted least-recently-used first once a
+    project or the whole store exceeds its quota, and directories without a
+    project record are removed.
+    """
+
+    def __init__(
+        self,
+        project_manager,
+        base_dir: str = "storage",
+        project_quota_bytes: int = 0,
+        global_quota_bytes: int = 0,
+        orphan_grace_seconds: int = 3600,
+    ):
+        self.project_manager = project_manager
+        self.base_dir = base_dir
+        self.project_quota_bytes = project_quota_bytes
+        self.global_quota_bytes = global_quota_bytes
+        self.orphan_grace_seconds = orphan_grace_seconds
+        self._lock = threading.Lock()
+
+    # --- Inspection ---
+
+    @staticmethod
+    def _last_access(stat: os.stat_result) -> float:
+        # atime alone is unreliable on noatime/relatime mounts
+        return max(stat.st_atime, stat.st_mtime)
+
+    def _scan_project(self, project_id: str) -> Dict:
+        project_dir = os.path.join(self.base_dir, project_id)
+        total = 0
+        intermediates = []
+        temp_files = []
+        last_access = 0.0
+
+        for root, _, files in os.walk(project_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                last_access = max(last_access, self._last_access(stat))
+                entry = {"path": path, "size": stat.st_size, "last_access": self._last_access(stat)}
+                if root != project_dir:
+                    continue
+                if name.endswith(TEMP_SUFFIXES):
+                    # Skip files still being written (atomic saves, downloads)
+                    if time.time() - stat.st_mtime >= TEMP_FILE_MIN_AGE_SECONDS:
+                        temp_files.append(entry)
+                elif SCENE_FILE_PATTERN.match(name):
+                    entry["tier"] = EVICTION_TIERS[os.path.splitext(name)[1]]
+                    intermediates.append(entry)
+
+        return {
+            "project_id": project_id,
+            "bytes": total,
+            "last_access": last_access,
+            "intermediates": intermediates,
+            "temp_files": temp_files,
+        }
+
+    def usage(self) -> Dict:
+        """Disk usage per project directory and in total."""
+        projects = []
+        if os.path.isdir(self.base_dir):
+            for name in os.listdir(self.base_dir):
+                if os.path.isdir(os.path.join(self.base_dir, name)):
+                    scan = self._scan_project(name)
+                    projects.append({"project_id": name, "bytes": scan["bytes"]})
+        projects.sort(key=lambda p: p["bytes"], reverse=True)
+        return {
+            "total_bytes": sum(p["bytes"] for p in projects),
+            "project_quota_bytes": self.project_quota_bytes,
+            "global_quota_bytes": self.global_quota_bytes,
+            "projects": projects,
+        }
+
+    # --- Collection ---
+
+    def _evict(self, entries: List[Dict], report: Dict, dry_run: bool = False) -> int:
+        reclaimed = 0
+        for entry in entries:
+            try:
+                if not dry_run:
+                    os.remove(entry["path"])
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"⚠️ Could not evict {entry['path']}: {e}")
+                continue
+            reclaimed += entry["size"]
+            report["evicted_files"] += 1
+        report["reclaimed_bytes"] += reclaimed
+        return reclaimed
+
+    def _in_use(self, project_id: str) -> bool:
+        """
+        Whether a project is being (or about to be) generated right now. The
+        statuses a pass starts from may be stale by the time it evicts: a
+        project re-queued or resumed meanwhile reuses its scene files.
+        """
+        # Imported here: checkpoints depends on this module's ACTIVE_STATUSES
+        from app.engine.checkpoints import lease_is_live
+
+        status = (self.project_manager.get_project_status(project_id, fresh=True) or {}).get('status')
+        if status in ACTIVE_STATUSES or status == "queued":
+            return True
+        return lease_is_live(self.project_manager.get_checkpoint(project_id))
+
+    def _eviction_order(self, entries: List[Dict]) -> List[Dict]:
+        # Completed projects only need intermediates for a re-render after an
+        # edit; failed/unfinished ones reuse them on retry, so they go later
+        return sorted(entries, key=lambda e: (e["tier"], e["status_rank"], e["project_last_access"]))
+
+    @staticmethod
+    def _newest_mtime(path: str) -> float:
+        # Rewriting a file does not touch its directory's mtime, so look inside
+        newest = os.stat(path).st_mtime
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    newest = max(newest, os.stat(os.path.join(root, name)).st_mtime)
+                except FileNotFoundError:
+                    continue
+        return newest
+
+    def _reconcile_orphans(self, known_ids: set, report: Dict, dry_run: bool = False):
+        now = time.time()
+        for name in os.listdir(self.base_dir):
+            path = os.path.join(self.base_dir, name)
+            if name in known_ids or not os.path.isdir(path):
+                continue
+            # A project file that exists but could not be read (e.g. caught
+            # mid-write) still belongs to a live project
+            if os.path.exists(os.path.join(path, PROJECT_FILENAME)):
+                continue
+            # Directories are created just before their project record is
+            # committed; leave recently written ones alone to avoid racing
+            # create_project
+            if now - self._newest_mtime(path) < self.orphan_grace_seconds:
+                continue
+            size = self._scan_project(name)["bytes"]
+            if not dry_run:
+                shutil.rmtree(path, ignore_errors=True)
+                print(f"🧹 Removed orphaned storage dir {name} ({size} bytes)")
+            report["orphans_removed"] += 1
+            report["reclaimed_bytes"] += size
+
+    def run(self, dry_run: bool = False) -> Dict:
+        """
+        One collection pass: drop temp files, reconcile orphans, then enforce
+        the per-project and global quotas. Returns what was (or, with dry_run,
+        would be) reclaimed.
+        """
+        report = {"reclaimed_bytes": 0, "evicted_files": 0, "orphans_removed": 0, "dry_run": dry_run}
+        if not os.path.isdir(self.base_dir):
+            return report
+
+        with self._lock:
+            started = time.time()
+            statuses = self.project_manager.list_project_statuses()
+            self._reconcile_orphans(set(statuses), report, dry_run)
+
+            scans = []
+            total = 0
+            for project_id, status in statuses.items():
+                if not os.path.isdir(os.path.join(self.base_dir, project_id)):
+                    continue
+                scan = self._scan_project(project_id)
+                total += scan["bytes"]
+                if status in ACTIVE_STATUSES:
+                    continue
+                for entry in scan["intermediates"]:
+                    entry["project_id"] = project_id
+                    entry["status_rank"] = 0 if status == "completed" else 1
+                    entry["project_last_access"] = scan["last_access"]
+                if self._in_use(project_id):
+                    continue
+                reclaimed = self._evict(scan["temp_files"], report, dry_run)
+                scan["bytes"] -= reclaimed
+                total -= reclaimed
+                scans.append(scan)
+
+            # Per-project quota
+            if self.project_quota_bytes:
+                for scan in scans:
+                    excess = scan["bytes"] - self.project_quota_bytes
+                    if excess <= 0 or self._in_use(scan["project_id"]):
+                        continue
+                    victims = []
+                    for entry in sorted(scan["intermediates"], key=lambda e: (e["tier"], e["last_access"])):
+                        if excess <= 0:
+                            break
+                        victims.append(entry)
+                        excess -= entry["size"]
+                    reclaimed = self._evict(victims, report, dry_run)
+                    scan["bytes"] -= reclaimed
+                    total -= reclaimed
+                    scan["intermediates"] = [e for e in scan["intermediates"] if e not in victims]
+
+            # Global quota: cheapest tier first, least recently used projects first
+            if self.global_quota_bytes:
+                excess = total - self.global_quota_bytes
+                if excess > 0:
+                    candidates = [e for scan in scans for e in scan["intermediates"]]
+                    victims = []
+                    in_use = {}
+                    for entry in self._eviction_order(candidates):
+                        if excess <= 0:
+                            break
+                        project_id = entry["project_id"]
+                        if project_id not in in_use:
+                            in_use[project_id] = self._in_use(project_id)
+                        if in_use[project_id]:
+                            continue
+                        victims.append(entry)
+                        excess -= entry["size"]
+                    self._evict(victims, report, dry_run)
+                    if excess > 0:
+                        print(f"⚠️ Storage still {excess} bytes over global quota (only final renders left)")
+
+            report["duration_seconds"] = round(time.time() - started, 3)
+
+        print(f"🧹 Storage GC{' (dry run)' if dry_run else ''}: reclaimed {report['reclaimed_bytes']} bytes, "
+              f"evicted {report['evicted_files']} files, removed {report['orphans_removed']} orphans")
+        return report
+
+    def start_background(self, interval_seconds: int) -> Optional[threading.Thread]:
+        """Runs a collection pass every `interval_seconds` on a daemon thread."""
+        if interval_seconds <= 0:
+            return None
+
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.run()
+                except Exception as e:
+                    print(f"Storage GC failed: {e}")
+
+        thread = threading.Thread(target=loop, name="storage-gc", daemon=True)
+        thread.start()
+        return thread
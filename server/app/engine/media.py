@@ -0,0 +1,100 @@
+import os
+import hashlib
+import threading
+from typing import Iterator, Optional, Tuple
+
+# Media URLs embed a content hash, so the bytes behind a URL never change and
+# clients/CDNs may cache them for as long as they like.
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 1024 * 1024
+
+_digests = {}  # (path, mtime_ns, size) -> digest
+_digests_lock = threading.Lock()
+
+def file_digest(path: str) -> str:
+    """
+    Short content hash of a file, cached until the file's mtime or size changes.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        digest = _digests.get(key)
+    if digest:
+        return digest
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()[:16]
+
+    with _digests_lock:
+        # Drop digests of earlier versions of the same file
+        for stale in [k for k in _digests if k[0] == key[0]]:
+            del _digests[stale]
+        _digests[key] = digest
+    return digest
+
+def versioned_by(filename: str) -> str:
+    """
+    The file whose hash versions `filename`. HLS playlists and segments are
+    derived from final.mp4 and share its version, so relative segment URIs in
+    a playlist resolve under the same hashed prefix.
+    """
+    return "final.mp4" if filename.startswith("hls/") else filename
+
+def media_url(project_id: str, project_dir: str, filename: str) -> Optional[str]:
+    """Immutable, content-addressed URL for a file in a project's storage dir."""
+    path = os.path.join(project_dir, filename)
+    version_path = os.path.join(project_dir, versioned_by(filename))
+    if not os.path.isfile(path) or not os.path.isfile(version_path):
+        return None
+    return f"/media/{project_id}/{file_digest(version_path)}/{filename}"
+
+def url_version(url: Optional[str]) -> Optional[str]:
+    """The content hash embedded in a /media URL, if it is one."""
+    parts = (url or "").split("/")
+    if len(parts) >= 5 and parts[1] == "media":
+        return parts[3]
+    return None
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range: bytes=...` header into an inclusive
+    (start, end) pair. Returns None when the header should be ignored and
+    raises ValueError when the range cannot be satisfied (e.g. `bytes=-0`).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # Multipart ranges are not worth supporting for video; serve it whole
+        return None
+
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(end_s)
+            start = max(size - length, 0)
+            end = size - 1
+    except ValueError:
+        # Malformed headers are ignored (RFC 9110), not rejected
+        return None
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, end
+
+def iter_file_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
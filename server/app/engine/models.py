@@ -2,22 +2,33 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from sqlmodel import SQLModel, Field, JSON
 from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import JSONB
 import uuid
 
+# JSONB on Postgres (indexable, see DBProjectManager search indexes), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class Project(SQLModel, table=True):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     name: str
     topic: str
     mode: str = "text_to_video"
+    parent_project_id: Optional[str] = None
+    batch_id: Optional[str] = Field(default=None, index=True)
     status: str = "created"
     
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     
     # Store complex objects as JSON
-    script: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
-    memory: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
-    assets: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+    script: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONType))
+    memory: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType))
+    assets: List[str] = Field(default_factory=list, sa_column=Column(JSONType))
+    # Generation lease and per-scene progress; only written via update_checkpoint
+    checkpoint: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType))
     
     video_url: Optional[str] = None
+    poster_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    hls_url: Optional[str] = None
     error: Optional[str] = None
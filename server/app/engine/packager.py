@@ -0,0 +1,148 @@
+import os
+import re
+import shutil
+import subprocess
+from typing import List, Optional, Tuple
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+HLS_DIRNAME = "hls"
+MASTER_PLAYLIST = "master.m3u8"
+SEGMENT_SECONDS = 4
+
+# Lower rungs of the ladder; the top rung is always the rendered file itself.
+# Rungs at or above the source height are skipped.
+DEFAULT_RUNGS = [
+    {"name": "480p", "height": 480, "video_bitrate": "1200k"},
+    {"name": "360p", "height": 360, "video_bitrate": "700k"},
+]
+
+def build_hls_command(video_path: str, output_dir: str, source_height: int, has_audio: bool, rungs: List[dict]) -> List[str]:
+    """
+    One ffmpeg pass: the source video stream is segmented with stream copy
+    (no decode), and only the lower rungs are scaled and re-encoded.
+    """
+    command = [FFMPEG_BINARY, "-y", "-loglevel", "error", "-i", video_path]
+
+    if rungs:
+        splits = "".join(f"[s{i}]" for i in range(len(rungs)))
+        scales = ";".join(
+            f"[s{i}]scale=-2:{rung['height']}[v{i}]" for i, rung in enumerate(rungs)
+        )
+        command += ["-filter_complex", f"[0:v]split={len(rungs)}{splits};{scales}"]
+
+    stream_map = [f"v:0{',a:0' if has_audio else ''},name:{source_height}p"]
+    command += ["-map", "0:v:0"]
+    for i, rung in enumerate(rungs):
+        command += ["-map", f"[v{i}]"]
+    if has_audio:
+        command += ["-map", "0:a:0"] * (len(rungs) + 1)
+
+    command += ["-c:v:0", "copy"]
+    for i, rung in enumerate(rungs, start=1):
+        command += [
+            f"-c:v:{i}", "libx264",
+            f"-b:v:{i}", rung['video_bitrate'],
+            f"-maxrate:v:{i}", rung['video_bitrate'],
+            f"-bufsize:v:{i}", rung['video_bitrate'],
+        ]
+        stream_map.append(f"v:{i}{f',a:{i}' if has_audio else ''},name:{rung['name']}")
+    if rungs:
+        # Keyframes on segment boundaries so every rung switches cleanly
+        command += ["-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})"]
+    if has_audio:
+        command += ["-c:a", "copy"]
+
+    command += [
+        "-f", "hls",
+        "-hls_time", str(SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(output_dir, "%v", "seg_%03d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(output_dir, "%v", "index.m3u8"),
+    ]
+    return command
+
+def measure_bandwidth(playlist_path: str) -> Optional[Tuple[int, int]]:
+    """
+    (peak, average) bits per second of a media playlist, measured from its
+    segment files and EXTINF durations.
+    """
+    base_dir = os.path.dirname(playlist_path)
+    peak = 0
+    total_bits = 0
+    total_duration = 0.0
+    duration = None
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line and not line.startswith("#") and duration:
+                bits = os.path.getsize(os.path.join(base_dir, line)) * 8
+                peak = max(peak, int(bits / duration))
+                total_bits += bits
+                total_duration += duration
+                duration = None
+    if not total_duration:
+        return None
+    return peak, int(total_bits / total_duration)
+
+def set_master_bandwidths(master_path: str):
+    """
+    Rewrites BANDWIDTH/AVERAGE-BANDWIDTH in the master playlist from the
+    segments actually written. ffmpeg has no target bitrate for the
+    stream-copied top rung and under-reports it, which would make players
+    rank the best rendition as the cheapest.
+    """
+    base_dir = os.path.dirname(master_path)
+    with open(master_path) as f:
+        lines = f.read().splitlines()
+
+    for i, line in enumerate(lines):
+        if not line.startswith("#EXT-X-STREAM-INF:") or i + 1 >= len(lines):
+            continue
+        measured = measure_bandwidth(os.path.join(base_dir, lines[i + 1].strip()))
+        if not measured:
+            continue
+        peak, average = measured
+        attributes = re.sub(r",?AVERAGE-BANDWIDTH=\d+", "", line[len("#EXT-X-STREAM-INF:"):])
+        attributes = re.sub(r"(?<![\w-])BANDWIDTH=\d+", f"BANDWIDTH={peak},AVERAGE-BANDWIDTH={average}", attributes)
+        lines[i] = "#EXT-X-STREAM-INF:" + attributes.lstrip(",")
+
+    with open(master_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def package_hls(video_path: str, assets_dir: str, rungs: Optional[List[dict]] = None) -> Optional[str]:
+    """
+    Packages a rendered MP4 as multi-bitrate HLS under `assets_dir/hls`.
+    Returns the master playlist path, or None if packaging failed.
+    """
+    output_dir = os.path.join(assets_dir, HLS_DIRNAME)
+    # Never leave segments from a previous render next to the new playlists
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        infos = ffmpeg_parse_infos(video_path)
+        source_height = infos['video_size'][1]
+        has_audio = infos.get('audio_found', False)
+
+        ladder = [r for r in (rungs or DEFAULT_RUNGS) if r['height'] < source_height]
+        print(f"📦 Packaging HLS: {source_height}p (copy) + {', '.join(r['name'] for r in ladder) or 'no extra rungs'}")
+
+        subprocess.run(
+            build_hls_command(video_path, output_dir, source_height, has_audio, ladder),
+            check=True,
+        )
+        master_path = os.path.join(output_dir, MASTER_PLAYLIST)
+        if not os.path.exists(master_path):
+            raise Exception("ffmpeg did not write a master playlist")
+        set_master_bandwidths(master_path)
+        return master_path
+
+    except Exception as e:
+        print(f"Error packaging HLS: {e}")
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return None
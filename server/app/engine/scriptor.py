@@ -1,6 +1,12 @@
 import os
+import re
+import copy
 import json
+import time
+import threading
 import traceback
+from collections import OrderedDict
+from typing import Iterator, Optional
 from google import genai
 from dotenv import load_dotenv
 
@@ -12,14 +18,10 @@ client = None
 if api_key:
     client = genai.Client(api_key=api_key)
 
-def generate_script(topic: str) -> dict:
-    """
-    Generates a video script (scenes, visual prompts, voiceover) from a topic using Gemini.
-    """
-    # Use gemini-2.0-flash
-    model_id = "gemini-2.0-flash"
-    
-    prompt = f"""
+SCRIPT_MODEL_ID = "gemini-2.0-flash"
+
+def build_script_prompt(topic: str) -> str:
+    return f"""
     You are an expert video producer. Create a script for a short 30-60 second explainer video about: "{topic}".
     
     Output strictly valid JSON with the following structure:
@@ -37,38 +39,272 @@ def generate_script(topic: str) -> dict:
     
     Do not add markdown formatting like ```json. Just return the raw JSON.
     """
-    
+
+def fallback_script() -> dict:
+    return {
+        "title": "Error generating script",
+        "scenes": [
+            {
+                "id": 1,
+                "voiceover": "Sorry, I could not generate a script at this time. Please check the server logs.",
+                "visual_prompt": "Error message on a computer screen",
+                "duration": 5
+            }
+        ]
+    }
+
+class ScriptStreamParser:
+    """
+    Incremental parser for the script JSON. Text chunks are fed in as they
+    arrive and each scene object is returned as soon as its closing brace is
+    seen, without waiting for the rest of the document.
+    """
+
+    TITLE_PATTERN = re.compile(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.title = None
+        self.scenes = []
+        self.complete = False     # stream finished cleanly with at least one scene
+        self._pos = None          # scan position inside the scenes array
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._scene_start = None
+        self._done = False
+
+    def feed(self, text: str) -> list:
+        """Appends a chunk and returns any scenes completed by it."""
+        self.buffer += text
+        if self.title is None:
+            match = self.TITLE_PATTERN.search(self.buffer)
+            if match:
+                try:
+                    self.title = json.loads(f'"{match.group(1)}"')
+                except ValueError:
+                    self.title = match.group(1)
+
+        if self._pos is None:
+            key = self.buffer.find('"scenes"')
+            if key == -1:
+                return []
+            bracket = self.buffer.find('[', key)
+            if bracket == -1:
+                return []
+            self._pos = bracket + 1
+
+        completed = []
+        while not self._done and self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._scene_start = self._pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._scene_start is not None:
+                    scene = self._parse_scene(self.buffer[self._scene_start:self._pos + 1])
+                    if scene:
+                        self.scenes.append(scene)
+                        completed.append(scene)
+                    self._scene_start = None
+            elif char == ']' and self._depth == 0:
+                self._done = True
+            self._pos += 1
+        return completed
+
+    def _parse_scene(self, raw: str) -> Optional[dict]:
+        try:
+            scene = json.loads(raw)
+        except ValueError:
+            print(f"⚠️ Skipping malformed scene: {raw[:60]}...")
+            return None
+        if not isinstance(scene, dict) or not scene.get('visual_prompt'):
+            return None
+        # Ids must be unique since they name the scene asset files
+        scene['id'] = len(self.scenes) + 1
+        scene.setdefault('voiceover', "")
+        return scene
+
+    def result(self) -> dict:
+        return {"title": self.title or "Untitled", "scenes": list(self.scenes)}
+
+def _stream_from_model(topic: str, parser: ScriptStreamParser) -> Iterator[dict]:
     try:
         if not client:
              raise Exception("Google API Key not configured.")
 
-        response = client.models.generate_content(
-            model=model_id,
-            contents=prompt
+        stream = client.models.generate_content_stream(
+            model=SCRIPT_MODEL_ID,
+            contents=build_script_prompt(topic)
         )
-        
-        text_content = response.text
-        
-        # Cleanup potential markdown
-        cleaned_text = text_content.replace("```json", "").replace("```", "").strip()
-        
-        # Parse JSON
-        script_data = json.loads(cleaned_text)
-        return script_data
-        
+        for chunk in stream:
+            if chunk.text:
+                yield from parser.feed(chunk.text)
+        parser.complete = bool(parser.scenes)
+
     except Exception as e:
-        print(f"CRITICAL ERROR in generate_script: {e}")
-        # traceback.print_exc()
-        
+        print(f"CRITICAL ERROR in stream_script: {e}")
+
+    if not parser.scenes:
         # Fallback for testing/failure
-        return {
-            "title": "Error generating script",
-            "scenes": [
-                {
-                    "id": 1,
-                    "voiceover": "Sorry, I could not generate a script at this time. Please check the server logs.",
-                    "visual_prompt": "Error message on a computer screen",
-                    "duration": 5
-                }
-            ]
-        }
+        fallback = fallback_script()
+        parser.title = fallback['title']
+        parser.scenes = fallback['scenes']
+        yield from parser.scenes
+
+# --- Script Cache ---
+# Bump PROMPT_VERSION whenever build_script_prompt changes meaningfully so
+# scripts produced by the old prompt are not served from the cache.
+PROMPT_VERSION = 1
+SCRIPT_CACHE_TTL_SECONDS = int(os.getenv("SCRIPT_CACHE_TTL_SECONDS", str(24 * 3600)))
+SCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("SCRIPT_CACHE_MAX_ENTRIES", "256"))
+
+def script_cache_key(topic: str) -> str:
+    normalized = " ".join(topic.lower().split())
+    return f"{SCRIPT_MODEL_ID}:v{PROMPT_VERSION}:{normalized}"
+
+class ScriptCache:
+    """
+    In-process LRU cache of completed scripts with a TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, script)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            stored_at, script = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(script)
+
+    def put(self, key: str, script: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(script))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class _InFlightScript:
+    """
+    A script currently being streamed for some cache key. Concurrent callers
+    for the same key follow it scene by scene instead of calling Gemini again.
+    """
+
+    def __init__(self):
+        self.scenes = []
+        self.title = None
+        self.done = False
+        self._cond = threading.Condition()
+
+    def publish(self, scene: dict):
+        with self._cond:
+            self.scenes.append(copy.deepcopy(scene))
+            self._cond.notify_all()
+
+    def finish(self, title: Optional[str]):
+        with self._cond:
+            self.title = title
+            self.done = True
+            self._cond.notify_all()
+
+    def follow(self) -> Iterator[dict]:
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.scenes) and not self.done:
+                    self._cond.wait()
+                if index >= len(self.scenes):
+                    return
+                scene = self.scenes[index]
+            index += 1
+            yield copy.deepcopy(scene)
+
+script_cache = ScriptCache(SCRIPT_CACHE_MAX_ENTRIES, SCRIPT_CACHE_TTL_SECONDS)
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+def stream_script(topic: str, parser: Optional[ScriptStreamParser] = None, use_cache: bool = True) -> Iterator[dict]:
+    """
+    Streams a script from Gemini, yielding each scene as soon as it is complete.
+    The accumulated script is available from parser.result() afterwards; if the
+    stream fails part-way, scenes that were already completed are kept.
+
+    With use_cache, completed scripts are served from script_cache and
+    concurrent requests for the same topic share a single upstream stream.
+    """
+    parser = parser or ScriptStreamParser()
+
+    if not use_cache:
+        yield from _stream_from_model(topic, parser)
+        return
+
+    key = script_cache_key(topic)
+    cached = script_cache.get(key)
+    if cached:
+        print(f"♻️ Script cache hit: {topic[:30]}")
+        parser.title = cached.get('title')
+        parser.scenes = cached.get('scenes', [])
+        parser.complete = True
+        yield from parser.scenes
+        return
+
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _InFlightScript()
+            _in_flight[key] = flight
+
+    if not is_leader:
+        print(f"⏳ Joining in-flight script generation: {topic[:30]}")
+        for scene in flight.follow():
+            parser.scenes.append(scene)
+            yield scene
+        parser.title = flight.title
+        return
+
+    try:
+        for scene in _stream_from_model(topic, parser):
+            flight.publish(scene)
+            yield scene
+        if parser.complete:
+            script_cache.put(key, parser.result())
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+        flight.finish(parser.title)
+
+def generate_script(topic: str, use_cache: bool = True) -> dict:
+    """
+    Generates a video script (scenes, visual prompts, voiceover) from a topic using Gemini.
+    """
+    parser = ScriptStreamParser()
+    for _ in stream_script(topic, parser, use_cache=use_cache):
+        pass
+    return parser.result()
@@ -1,24 +1,111 @@
 import os
+import copy
 import json
 import uuid
+import re
 import shutil
-from typing import Dict, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
+from app.engine.asset_store import AssetStore, LocalAssetStore
 
 STORAGE_DIR = "storage"
 
+SEARCH_FIELDS = ("topic", "style", "character", "voiceover")
+
+# Fields returned by the lightweight status read used by polling clients
+STATUS_COLUMNS = ("id", "status", "error", "video_url", "poster_url", "thumbnail_url", "hls_url", "updated_at")
+
+def search_tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+def character_terms(memory: dict) -> List[str]:
+    """Character names plus any declared aliases (`{name: {"aliases": [...]}}`)."""
+    terms = []
+    for name, value in (memory.get('characters') or {}).items():
+        terms.append(name)
+        if isinstance(value, dict):
+            terms.extend(alias for alias in value.get('aliases') or [] if isinstance(alias, str))
+    return terms
+
+def project_search_fields(project: dict) -> Dict[str, str]:
+    """The searchable text of a project, per field in SEARCH_FIELDS."""
+    memory = project.get('memory') or {}
+    scenes = (project.get('script') or {}).get('scenes') or []
+    return {
+        "topic": project.get('topic') or "",
+        "style": memory.get('visual_style') or "",
+        "character": " ".join(character_terms(memory)),
+        "voiceover": " ".join(scene.get('voiceover') or "" for scene in scenes),
+    }
+
+class SearchIndex:
+    """
+    In-memory inverted index (field -> token -> project ids) for the file
+    backend. Built from disk on first use and kept current by save_project.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, set]] = {field: {} for field in SEARCH_FIELDS}
+        self.terms: Dict[str, Dict[str, set]] = {}  # project id -> field -> tokens
+        self.lock = threading.Lock()
+
+    def update(self, project_id: str, project: dict):
+        fields = {f: set(search_tokens(t)) for f, t in project_search_fields(project).items()}
+        with self.lock:
+            self._remove(project_id)
+            for field, tokens in fields.items():
+                postings = self.postings[field]
+                for token in tokens:
+                    postings.setdefault(token, set()).add(project_id)
+            self.terms[project_id] = fields
+
+    def remove(self, project_id: str):
+        with self.lock:
+            self._remove(project_id)
+
+    def _remove(self, project_id: str):
+        for field, tokens in self.terms.pop(project_id, {}).items():
+            postings = self.postings[field]
+            for token in tokens:
+                ids = postings.get(token)
+                if ids:
+                    ids.discard(project_id)
+                    if not ids:
+                        del postings[token]
+
+    def search(self, tokens: List[str], fields: List[str]) -> set:
+        matches = set()
+        with self.lock:
+            for field in fields:
+                postings = self.postings[field]
+                # Smallest posting list first keeps the intersection cheap
+                lists = sorted((postings.get(t, set()) for t in set(tokens)), key=len)
+                if lists and lists[0]:
+                    matches |= set.intersection(*lists)
+        return matches
+
 class ProjectManager:
-    def __init__(self, base_dir: str = "storage"):
+    def __init__(self, base_dir: str = "storage", asset_store: Optional[AssetStore] = None):
         self.base_dir = base_dir
         os.makedirs(self.base_dir, exist_ok=True)
+        self.asset_store = asset_store or LocalAssetStore(base_dir)
+        self._search_index = None
+        self._search_index_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
 
-    def _get_project_path(self, project_id: str) -> str:
-        return os.path.join(self.base_dir, project_id)
+    def _get_project_path(self, project_id: str, create: bool = False) -> str:
+        return self.asset_store.local_dir(project_id, create=create)
 
     def _get_project_file(self, project_id: str) -> str:
         return os.path.join(self._get_project_path(project_id), "project.json")
 
-    def create_project(self, name: str, topic: str = "", mode: str = "text_to_video") -> dict:
+    def _get_checkpoint_file(self, project_id: str) -> str:
+        # Kept apart from project.json so scene threads checkpointing progress
+        # never race the pipeline's whole-project saves
+        return os.path.join(self._get_project_path(project_id), "checkpoint.json")
+
+    def create_project(self, name: str, topic: str = "", mode: str = "text_to_video", parent_project_id: Optional[str] = None) -> dict:
         project_id = str(uuid.uuid4())
         project_dir = self._get_project_path(project_id)
         os.makedirs(project_dir, exist_ok=True)
@@ -28,6 +115,8 @@ class ProjectManager:
             "name": name,
             "topic": topic,
             "mode": mode,
+            "parent_project_id": parent_project_id,
+            "batch_id": None,
             "status": "created",
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat(),
@@ -38,13 +127,44 @@ class ProjectManager:
                 "narrative_tone": ""
             },
             "assets": [], # List of asset file paths
-            "video_url": None
+            "video_url": None,
+            "poster_url": None,
+            "thumbnail_url": None,
+            "hls_url": None
         }
 
         self.save_project(project_id, project_data)
         return project_data
 
-    def get_project(self, project_id: str) -> Optional[dict]:
+    def create_projects(self, items: List[dict], mode: str = "text_to_video", memory: Optional[dict] = None,
+                        batch_id: Optional[str] = None, status: str = "created") -> List[dict]:
+        """
+        Creates one project per item ({"topic", "name"}) sharing a mode, a memory
+        template and a batch id. The file backend has no transactions, so this
+        is a plain loop kept for API parity with DBProjectManager.
+        """
+        projects = []
+        for item in items:
+            project = self.create_project(name=item.get('name') or item['topic'], topic=item['topic'], mode=mode)
+            project['batch_id'] = batch_id
+            project['status'] = status
+            if memory is not None:
+                project['memory'] = copy.deepcopy(memory)
+            self.save_project(project['id'], project)
+            projects.append(project)
+        return projects
+
+    def list_batch_statuses(self, batch_id: str) -> Dict[str, str]:
+        """Project id -> status for every project in a batch."""
+        statuses = {}
+        for pid in self.list_project_statuses():
+            p_data = self.get_project(pid)
+            if p_data and p_data.get('batch_id') == batch_id:
+                statuses[pid] = p_data.get('status', 'created')
+        return statuses
+
+    def get_project(self, project_id: str, fresh: bool = False) -> Optional[dict]:
+        # Always read from disk; `fresh` exists for parity with DBProjectManager
         file_path = self._get_project_file(project_id)
         if not os.path.exists(file_path):
             return None
@@ -56,11 +176,24 @@ class ProjectManager:
             print(f"Error loading project {project_id}: {e}")
             return None
 
+    def get_project_status(self, project_id: str, fresh: bool = False) -> Optional[dict]:
+        """Status fields only, for polling clients."""
+        project = self.get_project(project_id)
+        if not project:
+            return None
+        return {key: project.get(key) for key in STATUS_COLUMNS}
+
     def save_project(self, project_id: str, data: dict):
         file_path = self._get_project_file(project_id)
         data['updated_at'] = datetime.now().isoformat()
-        with open(file_path, 'w') as f:
+        # Write then rename so readers (API, storage GC) never see a
+        # truncated file; unique per writer since saves are not serialized
+        tmp_path = f"{file_path}.{uuid.uuid4().hex[:8]}.part"
+        with open(tmp_path, 'w') as f:
             json.dump(data, f, indent=4)
+        os.replace(tmp_path, file_path)
+        if self._search_index is not None:
+            self._search_index.update(project_id, data)
 
     def update_script(self, project_id: str, script: dict) -> Optional[dict]:
         project = self.get_project(project_id)
@@ -99,5 +232,73 @@ class ProjectManager:
         # Sort by updated_at desc
         return sorted(projects, key=lambda x: x.get('updated_at', ''), reverse=True)
 
+    def get_checkpoint(self, project_id: str) -> dict:
+        file_path = self._get_checkpoint_file(project_id)
+        if not os.path.exists(file_path):
+            return {}
+        try:
+            with open(file_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading checkpoint {project_id}: {e}")
+            return {}
+
+    def update_checkpoint(self, project_id: str, update: Callable[[dict], Any]) -> Any:
+        """
+        Atomically applies `update` to the project's generation checkpoint
+        (mutating it in place) and returns whatever `update` returns.
+        """
+        if not os.path.exists(self._get_project_file(project_id)):
+            return None
+        with self._checkpoint_lock:
+            checkpoint = self.get_checkpoint(project_id)
+            result = update(checkpoint)
+            file_path = self._get_checkpoint_file(project_id)
+            tmp_path = file_path + ".part"
+            with open(tmp_path, 'w') as f:
+                json.dump(checkpoint, f, indent=4)
+            os.replace(tmp_path, file_path)
+            return result
+
+    def list_project_statuses(self) -> Dict[str, str]:
+        """Project id -> status for every project, without sorting or full payloads."""
+        statuses = {}
+        if not os.path.exists(self.base_dir):
+            return statuses
+        for pid in os.listdir(self.base_dir):
+            p_data = self.get_project(pid) if os.path.isdir(os.path.join(self.base_dir, pid)) else None
+            if p_data:
+                statuses[pid] = p_data.get('status', 'created')
+        return statuses
+
+    def _get_search_index(self) -> SearchIndex:
+        with self._search_index_lock:
+            if self._search_index is None:
+                index = SearchIndex()
+                for project in self.list_projects():
+                    index.update(project['id'], project)
+                self._search_index = index
+            return self._search_index
+
+    def search_projects(self, query: str, field: Optional[str] = None, limit: int = 50) -> list:
+        """
+        Finds projects whose topic, visual style, character names/aliases or
+        voiceover text contain every word of the query. Restrict to one of SEARCH_FIELDS
+        with `field`.
+        """
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        fields = [field] if field else list(SEARCH_FIELDS)
+        project_ids = self._get_search_index().search(tokens, fields)
+
+        projects = []
+        for pid in project_ids:
+            p_data = self.get_project(pid)
+            if p_data:
+                projects.append(p_data)
+        projects.sort(key=lambda x: x.get('updated_at', ''), reverse=True)
+        return projects[:limit]
+
 # Global singleton or dependency
 manager = ProjectManager()
@@ -1,5 +1,9 @@
 import os
 import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Optional
 import requests
 from google import genai
 from google.genai import types
@@ -15,10 +19,76 @@ if api_key:
 
 from app.engine.context_manager import ContextManager
 
-def generate_veo_clip(prompt: str, output_path: str, context: dict = None, log_prefix: str = ""):
+def _write_atomic(output_path: str, content: bytes):
+    # A crash mid-write must not leave a truncated clip that later runs
+    # mistake for a finished scene
+    tmp_path = output_path + ".part"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, output_path)
+
+def _wait_for_operation(operation, log_prefix: str = ""):
+    # Poll the operation status until the video is ready.
+    while not operation.done:
+        print(".", end="", flush=True)
+        time.sleep(10)
+        operation = client.operations.get(operation)
+    return operation
+
+def _download_result(operation, output_path: str, log_prefix: str = "") -> bool:
+    if not (operation.result and operation.result.generated_videos):
+        print(f"{log_prefix}No video result found.")
+        return False
+
+    generated_video = operation.result.generated_videos[0]
+    print(f"⬇️ Downloading Video...")
+    
+    try:
+        video_content = client.files.download(file=generated_video.video)
+        _write_atomic(output_path, video_content)
+        return True
+    except Exception as e_dl:
+        print(f"Download method failed: {e_dl}")
+        if generated_video.video.uri:
+             v_res = requests.get(generated_video.video.uri)
+             _write_atomic(output_path, v_res.content)
+             return True
+        return False
+
+def resume_veo_clip(operation_name: str, output_path: str, log_prefix: str = "") -> bool:
+    """
+    Re-attaches to a Veo operation submitted by an earlier (possibly crashed)
+    run and downloads its result, instead of paying for a new generation.
+    """
+    if not client:
+        print("Error: No API Key for Veo")
+        return False
+
+    try:
+        print(f"🔁 {log_prefix}Re-attaching to operation {operation_name}")
+        operation = client.operations.get(types.GenerateVideosOperation(name=operation_name))
+        operation = _wait_for_operation(operation, log_prefix)
+        if operation.error:
+            print(f"❌ {log_prefix}Resumed operation failed: {operation.error}")
+            return False
+        print(f"\n✅ {log_prefix}Resumed operation completed!")
+        return _download_result(operation, output_path, log_prefix)
+    except Exception as e:
+        print(f"❌ {log_prefix}Could not resume operation {operation_name}: {e}")
+        return False
+
+def generate_veo_clip(
+    prompt: str,
+    output_path: str,
+    context: dict = None,
+    log_prefix: str = "",
+    on_submitted: Optional[Callable[[str, str], None]] = None,
+):
     """
     Generates a 5s video clip using Google Veo.
     Injects context (style/characters) into the prompt automatically.
+    `on_submitted(operation_name, model_name)` is called as soon as an
+    operation is accepted, so callers can checkpoint it.
     """
     # Rewrite Prompt using Context
     enhanced_prompt = ContextManager.apply_context(prompt, context)
@@ -55,36 +125,19 @@ def generate_veo_clip(prompt: str, output_path: str, context: dict = None, log_p
             )
             
             print(f"⏳ {log_prefix}Operation started: {operation.name}")
+            if on_submitted:
+                on_submitted(operation.name, model_name)
             
-            # Poll the operation status until the video is ready.
-            while not operation.done:
-                print(".", end="", flush=True)
-                time.sleep(10)
-                operation = client.operations.get(operation)
+            operation = _wait_for_operation(operation, log_prefix)
 
             print(f"\n✅ {log_prefix}Completed with {model_name}!")
             
-            if operation.result and operation.result.generated_videos:
-                generated_video = operation.result.generated_videos[0]
-                print(f"⬇️ Downloading Video...")
-                
-                try:
-                    video_content = client.files.download(file=generated_video.video)
-                    with open(output_path, "wb") as f:
-                        f.write(video_content)
-                    return True
-                except Exception as e_dl:
-                    print(f"Download method failed: {e_dl}")
-                    if generated_video.video.uri:
-                         v_res = requests.get(generated_video.video.uri)
-                         with open(output_path, "wb") as f:
-                             f.write(v_res.content)
-                         return True
-                    return False
-            else:
+            if not (operation.result and operation.result.generated_videos):
                 print("No video result found.")
                 continue # Try next model if result is empty? Unlikely to help but safe.
 
+            return _download_result(operation, output_path, log_prefix)
+
         except Exception as e:
             print(f"❌ {model_name} Failed: {e}")
             # If it's a quota error or not found, we continue to next model
@@ -93,9 +146,15 @@ def generate_veo_clip(prompt: str, output_path: str, context: dict = None, log_p
     print(f"❌ All Veo models failed for this scene.")
     return False
 
-def generate_image_constrained_video(prompt: str, output_path: str, log_prefix: str = ""):
+def generate_image_constrained_video(
+    prompt: str,
+    output_path: str,
+    log_prefix: str = "",
+    on_submitted: Optional[Callable[[str, str], None]] = None,
+):
     """
     Generates an image using Gemini 2.5 Flash, then uses that image to generate a video with Veo.
+    `on_submitted(operation_name, model_name)` is called once the Veo operation is accepted.
     """
     if not client:
         print("Error: No API Key for Veo")
@@ -155,35 +214,95 @@ def generate_image_constrained_video(prompt: str, output_path: str, log_prefix:
 
         image_param = generated_image_part.as_image() # This assumes the bytes are available or helper exists
 
+        model_name = "veo-3.1-generate-preview"
         operation = client.models.generate_videos(
-            model="veo-3.1-generate-preview",
+            model=model_name,
             prompt=prompt,
             image=image_param,
         )
 
         print(f"⏳ {log_prefix}Operation started: {operation.name}")
+        if on_submitted:
+            on_submitted(operation.name, model_name)
 
-        while not operation.done:
-            print(".", end="", flush=True)
-            time.sleep(10)
-            operation = client.operations.get(operation)
+        operation = _wait_for_operation(operation, log_prefix)
         
         print(f"\n✅ {log_prefix}Completed Video Generation!")
 
-        generated_video = operation.result.generated_videos[0]
-        video_content = client.files.download(file=generated_video.video)
-        with open(output_path, "wb") as f:
-            f.write(video_content)
-            
-        return True
+        return _download_result(operation, output_path, log_prefix)
 
     except Exception as e:
         print(f"❌ Image constrained generation failed: {e}")
         return False
 
-def extend_video(original_video_path: str, prompt: str, output_path: str, log_prefix: str = ""):
+# Uploaded files live on the Gemini Files API for ~48h. Cache the handle by
+# content hash so repeated extensions of the same source skip the upload and
+# the processing wait. Entries are dropped a little before they expire.
+UPLOAD_TTL_SECONDS = 47 * 3600
+UPLOAD_EXPIRY_MARGIN_SECONDS = 10 * 60
+
+_upload_cache = {}  # sha256 -> {"file": File, "expires_at": epoch seconds}
+_upload_lock = threading.Lock()
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _upload_expiry(video_file) -> float:
+    expiration = getattr(video_file, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        if expiration.tzinfo is None:
+            expiration = expiration.replace(tzinfo=timezone.utc)
+        return expiration.timestamp()
+    return time.time() + UPLOAD_TTL_SECONDS
+
+def get_uploaded_video(video_path: str, log_prefix: str = ""):
+    """
+    Returns an ACTIVE Files API handle for a local video, uploading it only if
+    no unexpired upload of the same content is cached.
+    """
+    content_hash = _file_sha256(video_path)
+
+    with _upload_lock:
+        cached = _upload_cache.get(content_hash)
+        if cached and cached["expires_at"] - UPLOAD_EXPIRY_MARGIN_SECONDS > time.time():
+            print(f"♻️ {log_prefix}Reusing uploaded video {cached['file'].name}")
+            return cached["file"]
+        _upload_cache.pop(content_hash, None)
+
+    print(f"⬆️ {log_prefix}Uploading original video context...")
+    video_file = client.files.upload(file=video_path)
+
+    # Wait for file processing if necessary (usually fast for small clips)
+    while video_file.state.name == "PROCESSING":
+        print(".", end="", flush=True)
+        time.sleep(2)
+        video_file = client.files.get(name=video_file.name)
+
+    if video_file.state.name == "FAILED":
+        print("❌ Video upload failed.")
+        return None
+
+    with _upload_lock:
+        _upload_cache[content_hash] = {
+            "file": video_file,
+            "expires_at": _upload_expiry(video_file),
+        }
+    return video_file
+
+def extend_video(
+    original_video_path: str,
+    prompt: str,
+    output_path: str,
+    log_prefix: str = "",
+    on_submitted: Optional[Callable[[str, str], None]] = None,
+):
     """
     Extends an existing video using Veo 3.1.
+    `on_submitted(operation_name, model_name)` is called once the operation is accepted.
     """
     if not client:
         print("Error: No API Key for Veo")
@@ -192,25 +311,17 @@ def extend_video(original_video_path: str, prompt: str, output_path: str, log_pr
     print(f"🎬 {log_prefix}Starting Video Extension: {prompt[:30]}...")
     
     try:
-        # Step 1: Upload the original video to Gemini
-        print(f"⬆️ {log_prefix}Uploading original video context...")
-        video_file = client.files.upload(path=original_video_path)
-        
-        # Wait for file processing if necessary (usually fast for small clips)
-        while video_file.state.name == "PROCESSING":
-            print(".", end="", flush=True)
-            time.sleep(2)
-            video_file = client.files.get(name=video_file.name)
-            
-        if video_file.state.name == "FAILED":
-             print("❌ Video upload failed.")
-             return False
+        # Step 1: Upload the original video to Gemini (cached by content hash)
+        video_file = get_uploaded_video(original_video_path, log_prefix=log_prefix)
+        if not video_file:
+            return False
 
         print(f"✅ {log_prefix}Video Uploaded. Generating Extension...")
 
         # Step 2: Generate Extension
+        model_name = "veo-3.1-generate-preview"
         operation = client.models.generate_videos(
-            model="veo-3.1-generate-preview",
+            model=model_name,
             video=video_file, 
             prompt=prompt,
             config=types.GenerateVideosConfig(
@@ -220,20 +331,14 @@ def extend_video(original_video_path: str, prompt: str, output_path: str, log_pr
         )
 
         print(f"⏳ {log_prefix}Operation started: {operation.name}")
+        if on_submitted:
+            on_submitted(operation.name, model_name)
 
-        while not operation.done:
-            print(".", end="", flush=True)
-            time.sleep(10)
-            operation = client.operations.get(operation)
+        operation = _wait_for_operation(operation, log_prefix)
         
         print(f"\n✅ {log_prefix}Completed Extension!")
 
-        generated_video = operation.result.generated_videos[0]
-        video_content = client.files.download(file=generated_video.video)
-        with open(output_path, "wb") as f:
-            f.write(video_content)
-            
-        return True
+        return _download_result(operation, output_path, log_prefix)
 
     except Exception as e:
         print(f"❌ Video extension failed: {e}")
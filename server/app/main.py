@@ -1,14 +1,22 @@
 import os
+import re
+import time
 import shutil
 import uuid
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-from app.engine import scriptor, artist, audio, director, veo, storage
+from app.engine import scriptor, artist, audio, director, veo, storage, media, packager
+from app.engine import asset_store as asset_stores
+from app.engine import checkpoints
+from app.engine.context_manager import ContextManager
+from app.engine.lifecycle import StorageLifecycleManager
 
 app = FastAPI()
 
@@ -22,15 +30,29 @@ app.add_middleware(
 )
 
 # Initialize Storage
-# Initialize Storage
+asset_store = asset_stores.from_env(base_dir="storage")
+print(f"✅ Using {type(asset_store).__name__} for media")
+
 database_url = os.getenv("DATABASE_URL")
 if database_url:
     print(f"✅ Using Database Storage: {database_url}")
     from app.engine.db_storage import DBProjectManager
-    project_manager = DBProjectManager(database_url)
+    project_manager = DBProjectManager(database_url, asset_store=asset_store)
 else:
     print("⚠️ Using Local File Storage (server/storage)")
-    project_manager = storage.ProjectManager(base_dir="storage")
+    project_manager = storage.ProjectManager(base_dir="storage", asset_store=asset_store)
+
+# Storage lifecycle: quotas (0 = unlimited) and periodic eviction of intermediates
+storage_lifecycle = StorageLifecycleManager(
+    project_manager,
+    base_dir=asset_store.base_dir,
+    project_quota_bytes=int(os.getenv("STORAGE_PROJECT_QUOTA_MB", "0")) * 1024 * 1024,
+    global_quota_bytes=int(os.getenv("STORAGE_GLOBAL_QUOTA_MB", "0")) * 1024 * 1024,
+)
+
+@app.on_event("startup")
+def start_storage_lifecycle():
+    storage_lifecycle.start_background(int(os.getenv("STORAGE_GC_INTERVAL_SECONDS", "3600")))
 
 # Request Models
 class CreateProjectRequest(BaseModel):
@@ -45,16 +67,242 @@ class UpdateScriptRequest(BaseModel):
 class UpdateMemoryRequest(BaseModel):
     memory: Dict[str, Any]
 
+class BatchItem(BaseModel):
+    topic: str
+    name: Optional[str] = None
+
+class CreateBatchRequest(BaseModel):
+    items: List[BatchItem]
+    mode: str = "text_to_video" # text_to_video, image_constrained
+    memory: Optional[Dict[str, Any]] = None # Shared memory template for every project
+    generate: bool = True
+    use_script_cache: bool = True
+
 class GenerateRequest(BaseModel):
     mode: Optional[str] = None # Optional override
+    use_script_cache: bool = True # False forces a fresh script from Gemini
 
 # --- Helper Functions ---
 
-def run_project_generation(project_id: str):
+# Where an extension's source is downloaded to when the parent's render only
+# exists in the object store
+EXTENSION_SOURCE_FILENAME = "extension_source.mp4"
+
+def resolve_extension_source(parent_project_id: Optional[str], scratch_dir: Optional[str] = None) -> Optional[str]:
     """
-    Background task to execute generation based on project state.
+    Picks the clip an extension project chains from: the parent's final.mp4,
+    or its last generated scene clip if the parent was never rendered. When
+    the render was published to a remote store and dropped locally, it is
+    fetched into `scratch_dir`.
     """
-    project = project_manager.get_project(project_id)
+    if not parent_project_id:
+        return None
+    parent = project_manager.get_project(parent_project_id, fresh=True)
+    if not parent:
+        return None
+
+    parent_dir = project_manager._get_project_path(parent_project_id)
+    final_path = os.path.join(parent_dir, "final.mp4")
+    if os.path.exists(final_path):
+        return final_path
+
+    version = media.url_version(parent.get('video_url'))
+    if scratch_dir and version:
+        fetched_path = os.path.join(scratch_dir, EXTENSION_SOURCE_FILENAME)
+        if asset_store.fetch(parent_project_id, version, "final.mp4", fetched_path):
+            return fetched_path
+
+    scenes = (parent.get('script') or {}).get('scenes', [])
+    for scene in reversed(scenes):
+        clip_path = os.path.join(parent_dir, f"scene_{scene['id']}.mp4")
+        if os.path.exists(clip_path):
+            return clip_path
+    return None
+
+# Scenes whose TTS/Veo work may run at the same time. Kept small because Veo
+# quota is per-project, but >1 lets scene 1 render while scripting continues.
+SCENE_CONCURRENCY = int(os.getenv("SCENE_CONCURRENCY", "2"))
+
+# Optional adaptive streaming: package each render as multi-bitrate HLS
+HLS_PACKAGING = os.getenv("HLS_PACKAGING", "false").lower() in ("1", "true", "yes")
+
+def discard_stale_scene_assets(project_id: str, scene: dict, project_dir: str, kinds=("audio", "video")):
+    """
+    Deletes a scene's narration/clip if the checkpoint shows it was made from
+    different text (a script discarded by a crash mid-stream), so it is
+    regenerated rather than mixed into the new script's render.
+    """
+    paths = {
+        "audio": [os.path.join(project_dir, f"scene_{scene['id']}{ext}") for ext in audio.AUDIO_EXTENSIONS],
+        "video": [os.path.join(project_dir, f"scene_{scene['id']}.mp4")],
+    }
+    for kind in kinds:
+        existing = [path for path in paths[kind] if os.path.exists(path)]
+        if existing and checkpoints.scene_asset_is_stale(project_manager, project_id, scene, kind):
+            print(f"♻️ Discarding stale {kind} for scene {scene['id']}")
+            for path in existing:
+                os.remove(path)
+
+def generate_project_audio(project_id: str, scenes: list, project_dir: str):
+    """
+    Narration for all scenes in one batched TTS engine call (local engines
+    load their voice once and skip per-scene network round trips).
+    """
+    for scene in scenes:
+        discard_stale_scene_assets(project_id, scene, project_dir, kinds=("audio",))
+    results = audio.generate_scene_audio(scenes, project_dir)
+    for scene in scenes:
+        audio_path = audio.scene_audio_path(project_dir, scene['id'])
+        if audio_path not in results:
+            continue # Already on disk
+        success = results[audio_path]
+        if not success:
+            # Retry on its own, e.g. after a batch process died part way
+            print(f"Retrying narration for scene {scene['id']} individually")
+            success = audio.generate_audio(scene['voiceover'], audio_path)
+        if success:
+            checkpoints.record_scene_asset(project_manager, project_id, scene, 'audio')
+
+def generate_scene_assets(project_id: str, scene: dict, project_dir: str, project_memory: dict, log_prefix: str = "",
+                          synthesize_audio: bool = True, lease: Optional[checkpoints.GenerationLease] = None):
+    """
+    Generates narration and visuals for a single scene, skipping assets that
+    already exist on disk. Progress is checkpointed so an interrupted run can
+    re-attach to the scene's Veo operation instead of paying for a new one.
+    Pass synthesize_audio=False when narration is batched separately. With a
+    lease, raises checkpoints.LeaseLost instead of touching Veo once the
+    lease is gone.
+    """
+    s_id = scene['id']
+    discard_stale_scene_assets(project_id, scene, project_dir, kinds=("audio", "video") if synthesize_audio else ("video",))
+
+    # Audio
+    if synthesize_audio and not audio.find_scene_audio(project_dir, s_id):
+         if audio.generate_audio(scene['voiceover'], audio.scene_audio_path(project_dir, s_id)):
+             checkpoints.record_scene_asset(project_manager, project_id, scene, 'audio')
+
+    # Visuals
+    video_path = os.path.join(project_dir, f"scene_{s_id}.mp4")
+    image_path = os.path.join(project_dir, f"scene_{s_id}.png")
+
+    if not os.path.exists(video_path):
+        veo_success = False
+        if lease:
+            lease.check()
+
+        submitted_operation = checkpoints.scene_operation(project_manager, project_id, scene)
+        if submitted_operation:
+            veo_success = veo.resume_veo_clip(submitted_operation, video_path, log_prefix=log_prefix)
+
+        if not veo_success:
+            if lease:
+                lease.check()
+            try:
+                # PASS MEMORY CONTEXT HERE
+                veo_success = veo.generate_veo_clip(
+                    scene['visual_prompt'], 
+                    video_path, 
+                    context=project_memory,
+                    log_prefix=log_prefix,
+                    on_submitted=lambda operation_name, model_name: checkpoints.record_scene_operation(
+                        project_manager, project_id, scene, operation_name, model_name
+                    )
+                )
+            except Exception as e:
+                print(f"Veo gen failed: {e}")
+
+        if veo_success:
+            checkpoints.record_scene_asset(project_manager, project_id, scene, 'video')
+        else:
+             print(f"Fallback to Imagen for Scene {s_id}")
+             artist.generate_image(scene['visual_prompt'], image_path)
+
+def resume_render_operation(project_id: str, prompt: str, output_path: str, log_prefix: str = "") -> bool:
+    """
+    Re-attaches to the Veo operation an interrupted image_constrained or
+    video_extension run submitted for the same prompt, if there is one.
+    """
+    submitted_operation = checkpoints.render_operation(project_manager, project_id, prompt)
+    if not submitted_operation:
+        return False
+    return veo.resume_veo_clip(submitted_operation, output_path, log_prefix=log_prefix)
+
+def run_project_generation(project_id: str, use_script_cache: bool = True, resume_only: bool = False):
+    """
+    Background task to execute generation based on project state. Holds the
+    project's generation lease for the whole run so that only one worker
+    generates a project at a time and crashed runs can be detected.
+    With resume_only, projects that are no longer queued or in progress
+    (e.g. finished meanwhile by another worker) are left alone.
+    """
+    lease = checkpoints.GenerationLease(project_manager, project_id)
+    if not lease.acquire():
+        print(f"⏭️ Project {project_id} is already being generated by another worker")
+        return
+    try:
+        if resume_only:
+            project = project_manager.get_project(project_id, fresh=True)
+            if not project or project.get('status') not in checkpoints.RESUMABLE_STATUSES:
+                return
+        _run_project_generation(project_id, lease, use_script_cache)
+    except checkpoints.LeaseLost as e:
+        # Another worker owns the project now; leave its status to that worker
+        print(f"⏹️ Abandoning generation of {project_id}: {e}")
+    finally:
+        lease.release()
+
+# Bounded queue for batch and recovered generations, so hundreds of queued
+# projects do not all hit Gemini/Veo at once
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "4"))
+generation_pool = ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY)
+_queued_generations = set()
+_queued_generations_lock = threading.Lock()
+
+def queue_generation(project_id: str, use_script_cache: bool = True, resume_only: bool = False) -> bool:
+    """Queues a project on generation_pool unless this process already has it queued."""
+    with _queued_generations_lock:
+        if project_id in _queued_generations:
+            return False
+        _queued_generations.add(project_id)
+
+    def job():
+        try:
+            run_project_generation(project_id, use_script_cache, resume_only=resume_only)
+        except Exception as e:
+            print(f"Queued generation failed for {project_id}: {e}")
+        finally:
+            with _queued_generations_lock:
+                _queued_generations.discard(project_id)
+
+    generation_pool.submit(job)
+    return True
+
+def recover_stale_generations():
+    """
+    Resumes projects left queued or in progress by a worker that died: scenes
+    already on disk are skipped and submitted Veo operations are re-attached.
+    """
+    for project_id in checkpoints.find_stale_generations(project_manager):
+        if queue_generation(project_id, resume_only=True):
+            print(f"🔁 Resuming interrupted generation for {project_id}")
+
+@app.on_event("startup")
+def start_generation_recovery():
+    def loop():
+        while True:
+            try:
+                recover_stale_generations()
+            except Exception as e:
+                print(f"Generation recovery sweep failed: {e}")
+            time.sleep(checkpoints.LEASE_SECONDS)
+
+    threading.Thread(target=loop, name="generation-recovery", daemon=True).start()
+
+def _run_project_generation(project_id: str, lease: checkpoints.GenerationLease, use_script_cache: bool = True):
+    """
+    Executes generation based on project state. Call via run_project_generation.
+    """
+    project = project_manager.get_project(project_id, fresh=True)
     if not project:
         return
 
@@ -65,15 +313,28 @@ def run_project_generation(project_id: str):
     project_dir = project_manager._get_project_path(project_id)
     mode = project.get('mode', 'text_to_video')
     
+    # Extract Memory
+    project_memory = project.get('memory', {})
+
+    scene_pool = ThreadPoolExecutor(max_workers=SCENE_CONCURRENCY)
+    scene_jobs = []
+
     try:
         # 1. Scripting (if not present)
+        # The script is streamed and each scene's assets are queued as soon as
+        # the scene is complete, so scene 1 starts while later ones are written.
         if mode == 'text_to_video' and not project.get('script'):
             project['status'] = 'scripting'
             project_manager.save_project(project_id, project)
             
-            script_data = scriptor.generate_script(project['topic'])
-            project_manager.update_script(project_id, script_data)
-            project = project_manager.get_project(project_id) # Reload
+            parser = scriptor.ScriptStreamParser()
+            for scene in scriptor.stream_script(project['topic'], parser, use_cache=use_script_cache):
+                scene_jobs.append(scene_pool.submit(
+                    generate_scene_assets, project_id, scene, project_dir, project_memory,
+                    f"[Scene {scene['id']}] ", lease=lease
+                ))
+            project_manager.update_script(project_id, parser.result())
+            project = project_manager.get_project(project_id, fresh=True) # Reload
 
         # 2. Asset Generation
         project['status'] = 'generating_assets'
@@ -81,21 +342,41 @@ def run_project_generation(project_id: str):
         
         output_path = os.path.join(project_dir, "final.mp4")
         
-        # Extract Memory
-        project_memory = project.get('memory', {})
-        
         if mode == "image_constrained":
-             success = veo.generate_image_constrained_video(
-                 project['topic'], 
-                 output_path, 
-                 log_prefix="[Image-Constrained] "
-             )
+             lease.check()
+             success = resume_render_operation(project_id, project['topic'], output_path, "[Image-Constrained] ")
+             if not success:
+                 lease.check()
+                 success = veo.generate_image_constrained_video(
+                     project['topic'], 
+                     output_path, 
+                     log_prefix="[Image-Constrained] ",
+                     on_submitted=lambda operation_name, model_name: checkpoints.record_render_operation(
+                         project_manager, project_id, project['topic'], operation_name, model_name
+                     )
+                 )
         
         elif mode == "video_extension":
-             # TODO: Handle parent video linking logic more robustly
-             pass 
-             success = False
-             project['error'] = "Extension mode refactor in progress"
+             source_path = resolve_extension_source(project.get('parent_project_id'), scratch_dir=project_dir)
+             if not source_path:
+                 raise Exception("Parent project has no rendered video to extend")
+
+             prompt = ContextManager.apply_context(project['topic'], project_memory)
+             # An operation extending an older render of the parent must not be reused
+             render_key = f"{prompt}\n{media.file_digest(source_path)}"
+             lease.check()
+             success = resume_render_operation(project_id, render_key, output_path, "[Extension] ")
+             if not success:
+                 lease.check()
+                 success = veo.extend_video(
+                     source_path,
+                     prompt,
+                     output_path,
+                     log_prefix="[Extension] ",
+                     on_submitted=lambda operation_name, model_name: checkpoints.record_render_operation(
+                         project_manager, project_id, render_key, operation_name, model_name
+                     )
+                 )
              
         else:
             # Text-to-Video / Script-based
@@ -103,47 +384,55 @@ def run_project_generation(project_id: str):
             if not script:
                  raise Exception("No script found to generate from")
             
-            total_scenes = len(script['scenes'])
-            
-            for idx, scene in enumerate(script['scenes']):
-                s_id = scene['id']
-                
-                # Audio
-                audio_path = os.path.join(project_dir, f"scene_{s_id}.mp3")
-                if not os.path.exists(audio_path):
-                     audio.generate_audio(scene['voiceover'], audio_path)
-                
-                # Visuals
-                video_path = os.path.join(project_dir, f"scene_{s_id}.mp4")
-                image_path = os.path.join(project_dir, f"scene_{s_id}.png")
-                
-                if not os.path.exists(video_path):
-                    log_prefix = f"[Scene {idx+1}/{total_scenes}] "
-                    veo_success = False
-                    try:
-                        # PASS MEMORY CONTEXT HERE
-                        veo_success = veo.generate_veo_clip(
-                            scene['visual_prompt'], 
-                            video_path, 
-                            context=project_memory,
-                            log_prefix=log_prefix
-                        )
-                    except Exception as e:
-                        print(f"Veo gen failed: {e}")
-                    
-                    if not veo_success:
-                         print(f"Fallback to Imagen for Scene {s_id}")
-                         artist.generate_image(scene['visual_prompt'], image_path)
+            # Scenes were not queued during scripting (script supplied up front),
+            # so all narration is known and can be synthesized in one batch
+            # alongside the visuals
+            if not scene_jobs:
+                scene_jobs.append(scene_pool.submit(
+                    generate_project_audio, project_id, script['scenes'], project_dir
+                ))
+                total_scenes = len(script['scenes'])
+                for idx, scene in enumerate(script['scenes']):
+                    scene_jobs.append(scene_pool.submit(
+                        generate_scene_assets, project_id, scene, project_dir, project_memory,
+                        f"[Scene {idx+1}/{total_scenes}] ", False, lease=lease
+                    ))
+
+            for job in scene_jobs:
+                job.result()
+            lease.check()
 
             # 3. Rendering
             project['status'] = 'rendering'
             project_manager.save_project(project_id, project)
             
-            success = director.render_video(script, project_dir, output_path)
+            success = director.render_video(
+                script, project_dir, output_path,
+                # Keyframes every HLS segment so packaging can copy the encoder output
+                keyframe_interval=director.RENDER_FPS * packager.SEGMENT_SECONDS if HLS_PACKAGING else None
+            )
 
         if success:
+            if mode != 'text_to_video':
+                # Veo output is used as-is, so fix up the container and previews here
+                director.remux_faststart(output_path)
+                director.extract_previews(output_path, project_dir)
+
             project['status'] = 'completed'
-            project['video_url'] = f"/static/{project_id}/final.mp4"
+            project['video_url'] = media.media_url(project_id, project_dir, "final.mp4")
+            project['poster_url'] = media.media_url(project_id, project_dir, director.POSTER_FILENAME)
+            project['thumbnail_url'] = media.media_url(project_id, project_dir, director.THUMBNAIL_FILENAME)
+            project['hls_url'] = None
+            if HLS_PACKAGING and packager.package_hls(output_path, project_dir):
+                project['hls_url'] = media.media_url(
+                    project_id, project_dir, f"{packager.HLS_DIRNAME}/{packager.MASTER_PLAYLIST}"
+                )
+
+            published = published_media_files(project_dir)
+            if not asset_store.publish(project_id, published):
+                raise Exception("Publishing rendered media failed")
+            asset_store.discard_local(project_id, published + [EXTENSION_SOURCE_FILENAME])
+            checkpoints.clear_progress(project_manager, project_id)
         else:
             project['status'] = 'failed'
             if not project.get('error'):
@@ -151,11 +440,18 @@ def run_project_generation(project_id: str):
 
         project_manager.save_project(project_id, project)
 
+    except checkpoints.LeaseLost:
+        raise
     except Exception as e:
         print(f"Project Job failed: {e}")
         project['status'] = 'failed'
         project['error'] = str(e)
         project_manager.save_project(project_id, project)
+    finally:
+        # Drop scenes that have not started, but wait for running ones: the
+        # caller releases the lease on return, and a retry must not find
+        # threads from this run still writing into the project directory
+        scene_pool.shutdown(wait=True, cancel_futures=True)
 
 
 # --- API Endpoints ---
@@ -163,10 +459,17 @@ def run_project_generation(project_id: str):
 @app.post("/api/projects")
 async def create_project(request: CreateProjectRequest):
     """Create a new project container."""
+    if request.mode == "video_extension":
+        if not request.parent_project_id:
+            raise HTTPException(status_code=400, detail="video_extension requires parent_project_id")
+        if not project_manager.get_project(request.parent_project_id):
+            raise HTTPException(status_code=404, detail="Parent project not found")
+
     project = project_manager.create_project(
         name=request.name,
         topic=request.topic,
-        mode=request.mode
+        mode=request.mode,
+        parent_project_id=request.parent_project_id
     )
     return project
 
@@ -175,6 +478,13 @@ async def list_projects():
     """List all projects."""
     return project_manager.list_projects()
 
+@app.get("/api/projects/search")
+async def search_projects(q: str, field: Optional[str] = None, limit: int = 50):
+    """Search projects by topic, visual style, character names/aliases or voiceover text."""
+    if field and field not in storage.SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(storage.SEARCH_FIELDS)}")
+    return project_manager.search_projects(q, field=field, limit=min(max(limit, 1), 200))
+
 @app.get("/api/projects/{project_id}")
 async def get_project(project_id: str):
     """Get full project state."""
@@ -183,6 +493,14 @@ async def get_project(project_id: str):
         raise HTTPException(status_code=404, detail="Project not found")
     return project
 
+@app.get("/api/projects/{project_id}/status")
+async def get_project_status(project_id: str):
+    """Lightweight status read for polling clients."""
+    status = project_manager.get_project_status(project_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return status
+
 @app.put("/api/projects/{project_id}/script")
 async def update_script(project_id: str, request: UpdateScriptRequest):
     """Update the script (Source of Truth)."""
@@ -200,13 +518,17 @@ async def update_memory(project_id: str, request: UpdateMemoryRequest):
     return project
 
 @app.post("/api/projects/{project_id}/generate")
-async def generate_project(project_id: str, background_tasks: BackgroundTasks):
+async def generate_project(project_id: str, background_tasks: BackgroundTasks, request: Optional[GenerateRequest] = None):
     """Trigger the generation process for a project."""
-    project = project_manager.get_project(project_id)
+    project = project_manager.get_project(project_id, fresh=True)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    background_tasks.add_task(run_project_generation, project_id)
+    if checkpoints.lease_is_live(project_manager.get_checkpoint(project_id)):
+        raise HTTPException(status_code=409, detail="Generation already in progress")
+
+    request = request or GenerateRequest()
+    background_tasks.add_task(run_project_generation, project_id, request.use_script_cache)
     return {"status": "queued", "project_id": project_id}
 
 # --- Legacy Support (Optional) ---
@@ -216,9 +538,190 @@ async def generate_project(project_id: str, background_tasks: BackgroundTasks):
 # Let's map the old endpoint to the new flow for backward compatibility if possible,
 # OR just break it as planned. Plan said "Breaking API Change". I will execute the break.
 
-# Mount storage as static resources (videos)
-os.makedirs("storage", exist_ok=True)
-app.mount("/static", StaticFiles(directory="storage"), name="static")
+# --- Batches ---
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+@app.post("/api/batches")
+def create_batch(request: CreateBatchRequest):
+    """Create many projects in one go and queue their generation."""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batches are limited to {MAX_BATCH_SIZE} projects")
+    if request.mode == "video_extension":
+        raise HTTPException(status_code=400, detail="video_extension projects cannot be batched")
+
+    batch_id = str(uuid.uuid4())
+    projects = project_manager.create_projects(
+        [item.model_dump() for item in request.items],
+        mode=request.mode,
+        memory=request.memory,
+        batch_id=batch_id,
+        status="queued" if request.generate else "created",
+    )
+
+    if request.generate:
+        for project in projects:
+            queue_generation(project['id'], request.use_script_cache, resume_only=True)
+
+    return {
+        "batch_id": batch_id,
+        "total": len(projects),
+        "project_ids": [p['id'] for p in projects],
+    }
+
+@app.get("/api/batches/{batch_id}")
+def get_batch(batch_id: str, include_projects: bool = False):
+    """Aggregate progress of a batch."""
+    statuses = project_manager.list_batch_statuses(batch_id)
+    if not statuses:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts: Dict[str, int] = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    finished = counts.get('completed', 0) + counts.get('failed', 0)
+    in_progress = sum(n for status, n in counts.items() if status in checkpoints.RESUMABLE_STATUSES)
+
+    response = {
+        "batch_id": batch_id,
+        "total": len(statuses),
+        "counts": counts,
+        "completed": counts.get('completed', 0),
+        "failed": counts.get('failed', 0),
+        "in_progress": in_progress,
+        # Created with generate=false (or edited back) and never queued
+        "not_started": len(statuses) - finished - in_progress,
+        "progress": round(finished / len(statuses), 4),
+        "done": finished == len(statuses),
+    }
+    if include_projects:
+        response["projects"] = [{"id": pid, "status": status} for pid, status in statuses.items()]
+    return response
+
+# --- Storage ---
+
+@app.get("/api/storage")
+def storage_usage():
+    """Disk usage per project and against the configured quotas."""
+    return storage_lifecycle.usage()
+
+@app.post("/api/storage/gc")
+def run_storage_gc(dry_run: bool = False):
+    """Run a lifecycle pass now and report reclaimed bytes and evictions."""
+    return storage_lifecycle.run(dry_run=dry_run)
+
+# --- Media Delivery ---
+
+MEDIA_FILES = {"final.mp4", director.POSTER_FILENAME, director.THUMBNAIL_FILENAME}
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".jpg": "image/jpeg",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+PROJECT_ID_PATTERN = re.compile(r"^[\w-]+$")
+HLS_FILE_PATTERN = re.compile(rf"^{packager.HLS_DIRNAME}/(?:[\w-]+/)?[\w-]+\.(?:m3u8|ts)$")
+
+def published_media_files(project_dir: str) -> list:
+    """Paths (relative to the project dir) of everything /media may serve."""
+    relpaths = [name for name in MEDIA_FILES if os.path.isfile(os.path.join(project_dir, name))]
+    hls_dir = os.path.join(project_dir, packager.HLS_DIRNAME)
+    for root, _, files in os.walk(hls_dir):
+        for name in files:
+            relpath = os.path.relpath(os.path.join(root, name), project_dir).replace(os.sep, "/")
+            if HLS_FILE_PATTERN.match(relpath):
+                relpaths.append(relpath)
+    return relpaths
+
+@app.get("/media/{project_id}/{version}/{filename:path}")
+def get_media(project_id: str, version: str, filename: str, request: Request):
+    """
+    Serves rendered media under content-hashed URLs with immutable caching,
+    ETags and byte-range support. Sync on purpose: hashing a file or calling
+    the object store blocks, so FastAPI runs it in its threadpool.
+    """
+    allowed = filename in MEDIA_FILES or HLS_FILE_PATTERN.match(filename)
+    if not allowed or not PROJECT_ID_PATTERN.match(project_id):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not asset_store.serves_locally:
+        # Stateless API nodes: media bytes come from the object store. Playlists
+        # are proxied so their relative segment URIs keep resolving under /media.
+        if filename.endswith(".m3u8"):
+            body = asset_store.read_bytes(project_id, version, filename)
+            if body is None:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return Response(
+                body,
+                media_type=MEDIA_TYPES[".m3u8"],
+                headers={"Cache-Control": media.MEDIA_CACHE_CONTROL},
+            )
+        return RedirectResponse(
+            asset_store.url_for(project_id, version, filename),
+            status_code=307,
+            headers={"Cache-Control": f"private, max-age={asset_store.redirect_max_age}"},
+        )
+
+    project_dir = project_manager._get_project_path(project_id, create=False)
+    path = os.path.join(project_dir, filename)
+    version_path = os.path.join(project_dir, media.versioned_by(filename))
+    if not os.path.isfile(path) or not os.path.isfile(version_path):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    # The URL names a specific version; anything else is a stale link
+    digest = media.file_digest(version_path)
+    if digest != version:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    size = os.path.getsize(path)
+    media_type = MEDIA_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+    headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": media.MEDIA_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if digest in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or digest in if_range):
+        try:
+            byte_range = media.parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                media.iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/static/{project_id}/{filename}")
+def get_legacy_media(project_id: str, filename: str):
+    """
+    Old /static URLs of projects rendered before content-hashed /media URLs
+    existed. Only published media is reachable: project directories also
+    hold project.json and checkpoint.json, which must not be served.
+    """
+    if filename not in MEDIA_FILES or not PROJECT_ID_PATTERN.match(project_id):
+        raise HTTPException(status_code=404, detail="Not Found")
+    project_dir = project_manager._get_project_path(project_id, create=False)
+    url = media.media_url(project_id, project_dir, filename)
+    if not url:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return RedirectResponse(url, status_code=308)
 
 # Mount Frontend (Static Files)
 # We assume the frontend build is copied to 'app/static_ui' in the Docker image
@@ -229,7 +732,7 @@ if os.path.exists(frontend_dir):
     @app.get("/{full_path:path}")
     async def catch_all(full_path: str):
         # Allow API calls to pass through
-        if full_path.startswith("api/") or full_path.startswith("static/"):
+        if full_path.startswith(("api/", "static/", "media/")):
              raise HTTPException(status_code=404, detail="Not Found")
         
         # Serve index.html for React Router